@@ -5,7 +5,7 @@
 # Copyright © 2018 R.F. Smith <rsmith@xs4all.nl>.
 # SPDX-License-Identifier: MIT
 # Created: 2012-08-25T23:37:50+0200
-# Last modified: 2020-10-24T11:58:46+0200
+# Last modified: 2026-10-18T01:47:09+0200
 """
 Partial implementation of the ‘ent’ program by John "Random" Walker in Python.
 
@@ -13,13 +13,53 @@ See http://www.fourmilab.ch/random/ for the original.
 """
 
 import argparse
+import collections
+import contextlib
+import csv
+import functools
+import itertools as it
 import math
-import statistics as stat
+import mmap
+import os
+import queue
+import random
+import stat
 import sys
+import threading
+import time
 import numpy as np
+from ent_accumulator import CHUNKSIZE, EntAccumulator, accresult, openinput, readchunks
+from ent_output import countout, terseout, textout
+from ent_profile import Profiler, jsonout, profileout, stage
+
+try:
+    import ent_kernel
+except ImportError:
+    ent_kernel = None
 
 __version__ = "2018.07.08"
-PI = 3.14159265358979323846
+SIDECAR = ".entstate"
+# ent_cache.MAXENTRIES; ent_cache (and sqlite3) is only imported when used.
+CACHEENTRIES = 1 << 16
+FOLLOWBYTES = 1 << 24
+TAILCHECK = 4096
+SAMPLEBLOCK = 1 << 16
+SAMPLEGROUPS = 64
+Z95 = 1.959963984540054
+# Minimal expected count per symbol value for a meaningful χ² probability.
+MINEXPECTED = 5
+VERDICTSTART = 4096
+VERDICTALPHA = 1e-6
+VERDICTZ = 4.753424308822899  # One-sided normal quantile for VERDICTALPHA.
+VERDICTDEFICIT = 1e-3
+VERDICTS = {
+    0: "looks random",
+    1: "almost certainly not random",
+    3: "suspect",
+    4: "insufficient data",
+}
+# Verdicts from best to worst, for the exit code.
+VERDICTORDER = (0, 4, 3, 1)
 
 
 def main(argv):
@@ -31,136 +71,1399 @@ def main(argv):
     """
     opts = argparse.ArgumentParser(prog="ent", description=__doc__)
     opts.add_argument(
-        "-c", action="store_true", help="print occurrence counts (not implemented yet)"
+        "-b", action="store_true", help="treat the input as a stream of bits"
+    )
+    opts.add_argument("-c", action="store_true", help="print occurrence counts")
+    opts.add_argument(
+        "--pairs",
+        action="store_true",
+        help="also calculate statistics of the pairs of successive bytes",
+    )
+    opts.add_argument(
+        "--symbol-bits",
+        metavar="N",
+        type=int,
+        choices=(8, 16, 32),
+        default=8,
+        help="calculate the statistics for symbols of 8, 16 or 32 bits",
+    )
+    opts.add_argument(
+        "-s", action="store_true", help="stream the files in chunks (bounded memory)"
+    )
+    opts.add_argument(
+        "--chunksize",
+        metavar="N",
+        type=int,
+        default=CHUNKSIZE,
+        help=f"chunk size in bytes for streaming (default {CHUNKSIZE})",
+    )
+    opts.add_argument(
+        "--limit",
+        metavar="N",
+        type=int,
+        help="only analyse the first N bytes of every file",
+    )
+    opts.add_argument(
+        "--verdict",
+        action="store_true",
+        help="only determine if the files look random, reading no more than needed",
+    )
+    opts.add_argument(
+        "--sample",
+        metavar="F",
+        type=float,
+        help="estimate the statistics from a fraction F of the blocks of a file",
+    )
+    opts.add_argument(
+        "--sample-bytes",
+        metavar="N",
+        type=int,
+        help="estimate the statistics from about N bytes in random blocks",
+    )
+    opts.add_argument(
+        "--seed",
+        metavar="S",
+        type=int,
+        default=0,
+        help="seed for the selection of the sampled blocks (default 0)",
+    )
+    opts.add_argument(
+        "-m", action="store_true", help="map the files into memory instead of reading"
+    )
+    opts.add_argument(
+        "-j", metavar="N", type=int, default=1, help="use N processes per file"
     )
     opts.add_argument("-t", action="store_true", help="terse output in CSV format")
+    opts.add_argument(
+        "--window",
+        metavar="W",
+        type=int,
+        help="print entropy, χ² and mean for every window of W bytes",
+    )
+    opts.add_argument(
+        "--step",
+        metavar="S",
+        type=int,
+        help="distance between the starts of the windows (default W)",
+    )
+    opts.add_argument(
+        "--binary",
+        action="store_true",
+        help="window output as binary records instead of CSV",
+    )
+    opts.add_argument(
+        "-@",
+        dest="manifest",
+        metavar="LIST",
+        help="batch mode; also read file names from LIST ('-' for stdin)",
+    )
+    opts.add_argument(
+        "-0", "--null", action="store_true", help="names in LIST end with a NUL byte"
+    )
+    opts.add_argument(
+        "--json",
+        action="store_true",
+        help="batch or follow output as JSON lines instead of CSV",
+    )
+    opts.add_argument(
+        "--unordered",
+        action="store_true",
+        help="batch output in order of completion instead of input order",
+    )
+    opts.add_argument(
+        "-f",
+        "--follow",
+        action="store_true",
+        help="keep reading the file and print the statistics at intervals",
+    )
+    opts.add_argument(
+        "--every",
+        metavar="N",
+        type=int,
+        help=f"follow mode interval in bytes (default {FOLLOWBYTES})",
+    )
+    opts.add_argument(
+        "--seconds",
+        metavar="S",
+        type=float,
+        help="follow mode interval in seconds",
+    )
+    opts.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help=f"keep the state in FILE{SIDECAR} and only read what was appended",
+    )
+    opts.add_argument(
+        "--cache",
+        metavar="FILE",
+        default=os.environ.get("ENT_CACHE"),
+        help="keep the results in the cache FILE (default $ENT_CACHE)",
+    )
+    opts.add_argument(
+        "--no-cache", action="store_true", help="do not use the result cache"
+    )
+    opts.add_argument(
+        "--refresh",
+        action="store_true",
+        help="analyse the files again and replace their results in the cache",
+    )
+    opts.add_argument(
+        "--cache-hash",
+        action="store_true",
+        help="identify cached files by a SHA-256 hash of their contents",
+    )
+    opts.add_argument(
+        "--cache-entries",
+        metavar="N",
+        type=int,
+        default=CACHEENTRIES,
+        help=f"maximum number of files in the cache (default {CACHEENTRIES})",
+    )
+    opts.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time and memory used by every stage",
+    )
+    opts.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="append the profile to FILE as JSON lines instead",
+    )
     opts.add_argument("-v", "--version", action="version", version=__version__)
     opts.add_argument(
-        "files", metavar="file", nargs="*", help="one or more files to process"
+        "files",
+        metavar="file",
+        nargs="*",
+        help="one or more files to process ('-' for standard input)",
     )
     args = opts.parse_args(argv)
-    for fname in args.files:
-        data, cnts = readdata(fname)
-        e = entropy(cnts)
-        c = pearsonchisquare(cnts)
-        p = pochisq(c)
-        d = math.fabs(p * 100 - 50)
-        m = monte_carlo(data)
+    if args.chunksize < 1:
+        opts.error("chunk size must be positive")
+    if args.limit is not None and args.limit < 1:
+        opts.error("the limit must be positive")
+    needfiles = args.m or args.j > 1 or args.incremental or args.symbol_bits != 8
+    if "-" in args.files and needfiles:
+        opts.error("standard input cannot be used with -m, -j, -i or --symbol-bits")
+    if args.limit is not None and (needfiles or args.manifest is not None):
+        opts.error("--limit cannot be used with -m, -j, -i, --symbol-bits or -@")
+    if args.j < 1:
+        opts.error("the number of processes must be positive")
+    if (args.b or args.c) and (args.window is not None or args.manifest is not None):
+        opts.error("-b and -c cannot be used in window or batch mode")
+    if args.j > 1 and args.window is not None:
+        opts.error("-j cannot be used in window mode")
+    if args.s and (args.m or args.j > 1):
+        opts.error("-s cannot be combined with -m or -j")
+    modes = (args.b, args.c, args.s, args.m, args.j > 1, args.window, args.manifest)
+    if args.symbol_bits != 8 and any(modes):
+        opts.error("--symbol-bits cannot be combined with other modes")
+    if args.incremental and (any(modes[2:]) or args.symbol_bits != 8):
+        opts.error("-i can only be combined with -b, -c and -t")
+    if args.pairs and (any(modes[3:]) or args.symbol_bits != 8 or args.incremental):
+        opts.error("--pairs can only be combined with -b, -c, -s, -t and --limit")
+    if args.follow:
+        if any(modes) or args.symbol_bits != 8 or args.incremental:
+            opts.error("-f can only be combined with --json and the intervals")
+        if len(args.files) != 1:
+            opts.error("-f needs exactly one file")
+        if args.every is None and args.seconds is None:
+            args.every = FOLLOWBYTES
+        if (args.every is not None and args.every < 1) or (
+            args.seconds is not None and args.seconds <= 0
+        ):
+            opts.error("the intervals must be positive")
+        name = args.files[0]
+        steps = follow(name, args.chunksize, args.every, args.seconds, args.limit)
         try:
-            scc = correlation(data)
-            es = f"{scc:.6f}"
-        except ValueError:
-            es = "undefined"
+            followout(name, steps, args.json)
+        except KeyboardInterrupt:
+            pass
+        except BrokenPipeError:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+    width = 1 if args.b else args.symbol_bits
+    if args.cache_entries < 1:
+        opts.error("the number of cache entries must be positive")
+    cachespec = None
+    if (
+        args.cache
+        and not args.no_cache
+        and args.window is None
+        and args.symbol_bits == 8
+        and args.limit is None
+    ):
+        cachespec = {
+            "path": args.cache,
+            "maxentries": args.cache_entries,
+            "usehash": args.cache_hash,
+            "refresh": args.refresh,
+        }
+    profiling = args.profile or args.profile_json is not None
+    sampling = args.sample is not None or args.sample_bytes is not None
+    special = (args.window is not None, args.manifest, args.follow, args.verdict)
+    if args.pairs and (sampling or any(special)):
+        opts.error("--pairs only works with the normal output")
+    if profiling and (sampling or any(special)):
+        opts.error("--profile only works with the normal output")
+    if args.verdict:
+        others = (args.symbol_bits != 8, args.follow, args.incremental, sampling)
+        if any(modes) or any(others):
+            opts.error("--verdict can only be combined with -t and --limit")
+        worst = 0
         if args.t:
-            terseout(data, e, c, p, d, es, m)
+            print("0,File-bytes,Verdict,File")
+        out = csv.writer(sys.stdout, lineterminator="\n")
+        for fname in args.files:
+            code, n = verdict(fname, args.chunksize, args.limit)
+            worst = max(worst, code, key=VERDICTORDER.index)
+            if args.t:
+                out.writerow([1, n, VERDICTS[code], fname])
+            else:
+                print(f"{fname}: {VERDICTS[code]} (after {n} bytes)")
+        return worst
+    if args.sample is not None or args.sample_bytes is not None:
+        if any(modes) or needfiles or args.follow or args.limit is not None:
+            opts.error("sampling can only be combined with -t")
+        if "-" in args.files:
+            opts.error("standard input cannot be sampled")
+        if args.sample is not None and args.sample_bytes is not None:
+            opts.error("use either --sample or --sample-bytes")
+        if args.sample is not None and not 0 < args.sample <= 1:
+            opts.error("the fraction to sample must be larger than 0 and at most 1")
+        if args.sample_bytes is not None and args.sample_bytes < 1:
+            opts.error("the number of bytes to sample must be positive")
+        status = 0
+        for fname in args.files:
+            try:
+                total, res, hw = sample(
+                    fname, args.sample_bytes, args.sample, args.seed
+                )
+            except (OSError, ValueError) as err:
+                print(f"ent: {fname}: {err}", file=sys.stderr)
+                status = 1
+                continue
+            n, e, c, m, mc, scc = res
+            p = pochisq(c)
+            d = math.fabs(p * 100 - 50)
+            if args.t:
+                terseout(n, m, e, c, p, d, f"{scc:.6f}", mc)
+            else:
+                textout(n, m, e, c, p, d, f"{scc:.6f}", mc)
+            sampleout(total, hw, args.t)
+        return status
+    if args.window is not None:
+        step = args.window if args.step is None else args.step
+        if args.window < 1 or step < 1:
+            opts.error("window and step must be positive")
+        rows = (
+            (f, windows(f, args.window, step, args.chunksize, args.limit))
+            for f in args.files
+        )
+        windowout(rows, args.binary)
+        return
+    if args.manifest is not None:
+        names = it.chain(args.files, readnames(args.manifest, args.null))
+        rows = batch(names, args.j, args.unordered, args.chunksize, cachespec)
+        return batchout(rows, args.json)
+    status = 0
+    with opencache(cachespec) as cache, Profiler(profiling) as prof:
+        for fname in args.files:
+            prof.file = fname
+            try:
+                if width > 8:
+                    with prof.stage("symbols") as rec:
+                        n, e, c, m, mc, scc = analysesymbols(fname, width)
+                        rec["bytes"] = n * width // 8
+                else:
+                    with prof.stage("accumulate"):
+                        if args.incremental:
+                            acc = resume(fname, args.chunksize, args.b)
+                        elif args.pairs:
+                            acc = streamdata(
+                                fname,
+                                args.chunksize,
+                                args.limit,
+                                PairAccumulator(bits=args.b),
+                            )
+                        else:
+                            acc = accumulate(
+                                fname,
+                                args.j,
+                                args.s,
+                                args.chunksize,
+                                args.m,
+                                cache,
+                                args.limit,
+                                args.b,
+                            )
+                    n, e, c, m, mc, scc = accresult(acc, args.b)
+            except (OSError, ValueError) as err:
+                print(f"ent: {fname}: {err}", file=sys.stderr)
+                prof.take()
+                status = 1
+                continue
+            if args.c:
+                countout(acc.bitcounts() if args.b else acc.counts, args.t)
+            es = "undefined" if scc is None else f"{scc:.6f}"
+            if width > 8 and n < MINEXPECTED << width:
+                p = d = None
+            else:
+                with prof.stage("pochisq"):
+                    p = pochisq(c, (1 << width) - 1)
+                d = math.fabs(p * 100 - 50)
+            if args.t:
+                terseout(n, m, e, c, p, d, es, mc, width)
+            else:
+                textout(n, m, e, c, p, d, es, mc, width)
+            if args.pairs and acc.n < 2:
+                pairout(None, args.t)
+            elif args.pairs:
+                with prof.stage("pairs"):
+                    ps = pairstats(acc.pairs)
+                pairout(ps, args.t)
+            if args.profile_json is not None:
+                jsonout(prof.take(), args.profile_json)
+            elif args.profile:
+                profileout(prof.take(), args.t)
+    return status
+
+
+def pairout(stats, terse=False):
+    """
+    Print the statistics of the pairs of successive bytes.
+
+    Arguments:
+        stats: The figures returned by ``pairstats``, or None if the data has
+            fewer than two bytes.
+        terse: Print CSV instead of text.
+    """
+    if terse:
+        print("8,Pairs,Pair-entropy,Conditional-entropy,Pair-chi-square,", end="")
+        print("Pair-chi-square-p")
+    if stats is None:
+        if terse:
+            print("9,0,undefined,undefined,undefined,undefined")
         else:
-            textout(data, e, c, p, d, es, m)
+            print("- pairs: undefined (fewer than 2 bytes)")
+        return
+    n, e, cond, chi2, p = stats
+    if terse:
+        print(f"9,{n},{e:.6f},{cond:.6f},{chi2:.6f},{p:.6f}")
+        return
+    print(f"- Entropy of the {n} pairs of successive bytes is {e:.6f} bits per")
+    print("  pair (random = 16). Given the previous byte, the entropy of a byte")
+    print(f"  is {cond:.6f} bits (random = 8).")
+    print(f"- χ² distribution for {n} pairs is {chi2:.2f}, and randomly")
+    print(f"  would exceed this value {100 * p:.2f}% of the times.")
 
 
-def terseout(data, e, chi2, p, d, scc, mc):
+def sampleout(total, hw, terse=False):
     """
-    Print the results in terse CSV.
+    Print the confidence intervals of estimated statistics.
 
     Arguments:
-        data: file contents
-        e: Entropy of the data in bits per byte.
-        chi2: Χ² value for the data.
-        p: Probability of normal z value.
-        d: Percent distance of p from centre.
-        scc: Serial correlation coefficient.
-        mc: Monte Carlo approximation of π.
+        total: Size of the file in bytes.
+        hw: Half-widths of the 95% confidence intervals of the entropy, χ²,
+            mean, Monte Carlo value for π and serial correlation coefficient.
+            NaN if they cannot be estimated.
+        terse: Print CSV instead of text.
     """
-    print("0,File-bytes,Entropy,Chi-square,Mean," "Monte-Carlo-Pi,Serial-Correlation")
-    n = len(data)
-    m = data.mean()
-    print(f"1,{n},{e:.6f},{chi2:.6f},{m:.6f},{mc:.6f},{scc}")
+    if terse:
+        print(
+            "4,Total-bytes,Entropy-CI,Chi-square-CI,Mean-CI,Monte-Carlo-Pi-CI,", end=""
+        )
+        print("Serial-Correlation-CI")
+        print(
+            f"5,{total},"
+            + ",".join(f"{h:.6f}" if math.isfinite(h) else "n/a" for h in hw)
+        )
+        return
+    if not all(math.isfinite(h) for h in hw):
+        print(f"- Estimated from one random block of this {total} byte file;")
+        print("  confidence intervals are n/a.")
+        return
+    e, c, m, mc, scc = hw
+    print(f"- Estimated from random blocks of this {total} byte file, with 95%")
+    print(f"  confidence intervals of ±{e:.6f} for the entropy, ±{c:.2f} for χ²,")
+    print(f"  ±{m:.4f} for the mean, ±{mc:.6f} for π and ±{scc:.6f} for the")
+    print("  serial correlation.")
 
 
-def textout(data, e, chi2, p, d, scc, mc):
+def batchout(rows, usejson=False):
     """
-    Print the results in plain text.
+    Print the results of a batch run, one line per file.
+
+    CSV output has a single header line. If standard output is closed early,
+    for instance by ``head``, the rest of the output is discarded.
 
     Arguments:
-        data: file contents
-        e: Entropy of the data in bits per byte.
-        chi2: Χ² value for the data.
-        p: Probability of normal z value.
-        d: Percent distance of p from centre.
-        scc: Serial correlation coefficient.
-        mc: Monte Carlo approximation of π.
+        rows: Iterable of (name, results) tuples as produced by batch.
+        usejson: Print JSON lines instead of CSV.
+
+    Returns:
+        1 if any file could not be analysed, otherwise 0.
     """
-    print(f"- Entropy is {e:.6f} bits per byte.")
-    print("- Optimum compression would reduce the size")
-    red = (100 * (8 - e)) / 8
-    n = len(data)
-    print(f"  of this {n} byte file by {red:.0f}%.")
-    print(f"- χ² distribution for {n} samples is {chi2:.2f}, and randomly")
-    pp = 100 * p
-    print(f"  would exceed this value {pp:.2f}% of the times.")
-    print("  According to the χ² test, this sequence", end=" ")
-    if d > 49:
-        print("is almost certainly not random")
-    elif d > 45:
-        print("is suspected of being not random.")
-    elif d > 40:
-        print("is close to random, but not perfect.")
+    keys = ("file-bytes", "entropy", "chi-square", "p", "mean")
+    keys += ("monte-carlo-pi", "serial-correlation")
+    status = 0
+    try:
+        if not usejson:
+            print(
+                "0,File-bytes,Entropy,Chi-square,Mean,"
+                "Monte-Carlo-Pi,Serial-Correlation,File"
+            )
+        out = csv.writer(sys.stdout, lineterminator="\n")
+        for name, res in rows:
+            if isinstance(res, str):
+                print(f"ent: {name}: {res}", file=sys.stderr)
+                status = 1
+                continue
+            if usejson:
+                rec = {"file": name}
+                rec.update(zip(keys, res))
+                print(jsonline(rec))
+                continue
+            n, e, c, p, m, mc, scc = res
+            es = "undefined" if scc is None else f"{scc:.6f}"
+            row = [1, n, f"{e:.6f}", f"{c:.6f}", f"{m:.6f}", f"{mc:.6f}", es]
+            out.writerow(row + [name])
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return status
+
+
+def jsonline(rec):
+    """
+    Format a record as a line of JSON.
+
+    JSON has no NaN or infinity, so values that are not finite (like the
+    Monte Carlo value for fewer than 6 bytes) become null.
+
+    Arguments:
+        rec: Dictionary to format.
+
+    Returns:
+        The JSON text.
+    """
+    import json
+
+    rec = {
+        k: None if isinstance(v, float) and not math.isfinite(v) else v
+        for k, v in rec.items()
+    }
+    return json.dumps(rec, allow_nan=False)
+
+
+def followout(name, steps, usejson=False):
+    """
+    Print the statistics of a followed file as they become available.
+
+    For every interval two lines are printed; one for the bytes read in
+    that interval, and one for all bytes read so far. Besides the fields of
+    the terse output, they contain the offset in the stream at the end of
+    the interval, the scope (“interval” or “total”) and the name of the file.
+
+    Arguments:
+        name: Name of the file.
+        steps: Iterable of (total, interval) accumulators as produced by
+            follow.
+        usejson: Print JSON lines instead of CSV.
+    """
+    keys = ("file-bytes", "entropy", "chi-square", "p", "mean")
+    keys += ("monte-carlo-pi", "serial-correlation")
+    if not usejson:
+        print(
+            "0,File-bytes,Entropy,Chi-square,Mean,Monte-Carlo-Pi,"
+            "Serial-Correlation,Offset,Scope,File",
+            flush=True,
+        )
+    out = csv.writer(sys.stdout, lineterminator="\n")
+    for total, part in steps:
+        for scope, acc in (("interval", part), ("total", total)):
+            n, e, c, m, mc, scc = acc.result()
+            if usejson:
+                rec = dict(zip(keys, (n, e, c, pochisq(c), m, mc, scc)))
+                rec.update(offset=total.n, scope=scope, file=name)
+                print(jsonline(rec))
+                continue
+            es = "undefined" if scc is None else f"{scc:.6f}"
+            row = [1, n, f"{e:.6f}", f"{c:.6f}", f"{m:.6f}", f"{mc:.6f}", es]
+            out.writerow(row + [total.n, scope, name])
+        sys.stdout.flush()
+
+
+WINDOWTYPE = np.dtype(
+    [("offset", "<u8"), ("entropy", "<f8"), ("chisquare", "<f8"), ("mean", "<f8")]
+)
+
+
+def windowout(rows, binary=False):
+    """
+    Print the results for the windows of files.
+
+    CSV output has a single header line. Binary output consists of records of
+    type ``WINDOWTYPE``; the records of the files follow each other.
+
+    Arguments:
+        rows: Iterable of (name, blocks) tuples, where blocks is an iterable
+            of record arrays as produced by windows.
+        binary: Write binary records instead of CSV.
+    """
+    if binary:
+        for _, blocks in rows:
+            for rec in blocks:
+                sys.stdout.buffer.write(rec.tobytes())
+        sys.stdout.buffer.flush()
+        return
+    print("0,Offset,Entropy,Chi-square,Mean,File")
+    out = csv.writer(sys.stdout, lineterminator="\n")
+    for name, blocks in rows:
+        for rec in blocks:
+            out.writerows(
+                (1, o, f"{e:.6f}", f"{c:.6f}", f"{m:.6f}", name)
+                for o, e, c, m in rec.tolist()
+            )
+
+
+def readnames(src, null=False):
+    """
+    Read file names from a list, one at a time.
+
+    Arguments:
+        src: Path of the list, or '-' for standard input.
+        null: Names are terminated by NUL bytes instead of newlines.
+
+    Yields:
+        File names.
+    """
+    sep = b"\0" if null else b"\n"
+    if src == "-":
+        inf = contextlib.nullcontext(sys.stdin.buffer)
     else:
-        print("looks random.")
-    m = data.mean()
-    print(f"- Arithmetic mean value of data bytes is {m:.4f} (random = 127.5).")
-    err = 100 * (math.fabs(PI - mc) / PI)
-    print(f"- Monte Carlo value for π is {mc:.9f} (error {err:.2f}%).")
-    print(f"- Serial correlation coefficient is {scc} (totally uncorrelated = 0.0).")
+        inf = open(src, "rb")
+    with inf as lst:
+        rest = b""
+        while True:
+            block = lst.read(CHUNKSIZE)
+            names = (rest + block).split(sep)
+            rest = names.pop() if block else b""
+            for name in names:
+                if not null:
+                    name = name.rstrip(b"\r")
+                if name:
+                    yield os.fsdecode(name)
+            if not block:
+                break
+
+
+def batch(names, jobs=1, unordered=False, size=CHUNKSIZE, cachespec=None):
+    """
+    Analyse a large number of files with a pool of processes.
+
+    Files are sent to the workers in small groups. Only a limited number of
+    groups is in progress at any time, so neither the list of names nor the
+    results need to fit in memory.
 
+    Arguments:
+        names: Iterable of file names.
+        jobs: Number of processes to use.
+        unordered: Yield results as they become available instead of in the
+            order of the names.
+        size: Number of bytes to process at a time.
+        cachespec: Optional dictionary of arguments for ResultCache; every
+            worker opens the cache itself.
+
+    Yields:
+        (name, results) tuples. The results are (n, e, chi2, p, m, mc, scc)
+        or an error message.
+    """
+    import concurrent.futures as cf
+
+    GROUP = 32
+    groups = iter(lambda: list(it.islice(names, GROUP)), [])
+    with cf.ProcessPoolExecutor(jobs) as ex:
+        pending = collections.deque(
+            ex.submit(analysegroup, g, size, cachespec)
+            for g in it.islice(groups, 4 * jobs)
+        )
+        while pending:
+            if unordered:
+                done, _ = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+                fut = done.pop()
+                pending.remove(fut)
+            else:
+                fut = pending.popleft()
+            for g in it.islice(groups, 1):
+                pending.append(ex.submit(analysegroup, g, size, cachespec))
+            yield from fut.result()
+
+
+def analysegroup(names, size=CHUNKSIZE, cachespec=None):
+    """
+    Analyse a group of files for batch.
+
+    Arguments:
+        names: List of file names.
+        size: Number of bytes to process at a time.
+        cachespec: Optional dictionary of arguments for ResultCache.
+
+    Returns:
+        List of (name, results) tuples.
+    """
+    rv = []
+    with opencache(cachespec) as cache:
+        for name in names:
+            try:
+                acc = accumulate(name, stream=True, size=size, cache=cache)
+                n, e, c, m, mc, scc = acc.result()
+                rv.append((name, (n, e, c, pochisq(c), m, mc, scc)))
+            except (OSError, ValueError) as err:
+                rv.append((name, str(err)))
+    return rv
+
+
+@contextlib.contextmanager
+def opencache(cachespec):
+    """
+    Open the result cache, if one is wanted.
+
+    Arguments:
+        cachespec: Dictionary of arguments for ResultCache, or None.
+
+    Yields:
+        A ResultCache, or None.
+    """
+    if cachespec is None:
+        yield None
+        return
+    from ent_cache import ResultCache
+
+    with ResultCache(**cachespec) as cache:
+        yield cache
+
+
+def accumulate(
+    name,
+    jobs=1,
+    stream=False,
+    size=CHUNKSIZE,
+    mapped=False,
+    cache=None,
+    limit=None,
+    bits=False,
+):
+    """
+    Accumulate the figures for the statistics of a file.
+
+    Standard input and limited reads are always streamed, and not cached.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input.
+        jobs: Number of processes to use.
+        stream: Read the file in chunks instead of all at once.
+        size: Number of bytes to process at a time.
+        mapped: Map the file into memory instead of reading it.
+        cache: Optional ResultCache. If the file is unchanged since it was
+            stored, it is not read again.
+        limit: Maximum number of bytes to read, or None to read to the end.
+        bits: Also count what is needed for the statistics of the bits.
+
+    Returns:
+        A NumpyAccumulator for the contents of the file.
+    """
+    if name == "-" or limit is not None:
+        return streamdata(name, size, limit, NumpyAccumulator(bits=bits))
+    if cache is not None:
+        key = cache.key(name)
+        state = cache.get(key)
+        if state is not None and (not bits or state["bitpairs"] is not None):
+            return NumpyAccumulator.fromstate(state)
+        acc = accumulate(name, jobs, stream, size, mapped, bits=bits)
+        cache.put(key, acc.state())
+        return acc
+    if jobs > 1:
+        return parallel(name, jobs, size, bits)
+    if mapped:
+        return mapdata(name, size, bits)
+    if stream:
+        return streamdata(name, size, acc=NumpyAccumulator(bits=bits))
+    with stage("read") as rec:
+        data = np.fromfile(name, np.ubyte)
+        rec["bytes"] = len(data)
+    return NumpyAccumulator(bits=bits).update(data)
 
-def readdata(name):
+
+def analyse(name, jobs=1, stream=False, size=CHUNKSIZE, mapped=False):
     """
-    Read the data from a file and count byte occurences.
+    Calculate the statistics for a file.
 
     Arguments:
         name: Path of the file to read
+        jobs: Number of processes to use.
+        stream: Read the file in chunks instead of all at once.
+        size: Number of bytes to process at a time.
+        mapped: Map the file into memory instead of reading it.
 
     Returns:
-        data: numpy array containing the byte values.
-        cnts: numpy array containing the occurance of each byte.
+        n: Number of bytes.
+        e: Entropy in bits per byte.
+        chi2: Χ² value.
+        m: Arithmetic mean.
+        mc: Monte Carlo approximation of π.
+        scc: Serial correlation coefficient, or None if undefined.
+    """
+    return accumulate(name, jobs, stream, size, mapped).result()
+
+
+SYMBOLTYPES = {8: np.ubyte, 16: np.dtype("<u2"), 32: np.dtype("<u4")}
+
+
+def analysesymbols(name, bits):
     """
-    data = np.fromfile(name, np.ubyte)
-    cnts = np.bincount(data)
+    Calculate the statistics for a file as a sequence of wider symbols.
+
+    The Monte Carlo value is calculated from the bytes of the symbols.
+
+    Arguments:
+        name: Path of the file to read
+        bits: Size of the symbols; 8, 16 or 32 bits.
+
+    Returns:
+        The same figures as ``analyse``, for symbols instead of bytes.
+    """
+    data, cnts = readdata(name, bits)
+    if not len(data):
+        raise ValueError(
+            "shorter than one symbol" if os.path.getsize(name) else "no data"
+        )
+    try:
+        scc = correlation(data)
+    except ValueError:
+        scc = None
+    e, c = entropy(cnts), pearsonchisquare(cnts, 1 << bits)
+    m = int(data.sum(dtype=np.uint64)) / len(data)
+    return len(data), e, c, m, monte_carlo(data.view(np.ubyte)), scc
+
+
+def readdata(name, bits=8):
+    """
+    Read the data from a file and count symbol occurences.
+
+    Symbols of 16 and 32 bits are little-endian; an incomplete symbol at the
+    end of the file is ignored. For 16-bit symbols all 65536 values are
+    counted. For 32-bit symbols only the values that occur are counted, so
+    the memory use depends on the number of different values.
+
+    Arguments:
+        name: Path of the file to read
+        bits: Size of the symbols; 8, 16 or 32 bits.
+
+    Returns:
+        data: numpy array containing the symbol values.
+        cnts: numpy array containing the occurance of each symbol value.
+    """
+    data = np.fromfile(name, SYMBOLTYPES[bits])
+    if bits == 32:
+        cnts = np.unique(data, return_counts=True)[1]
+    else:
+        cnts = histogram(data, 1 << bits)
     return data, cnts
 
 
+def histogram(d, nbins=256):
+    """
+    Count the occurrence of each byte (or 16-bit symbol) value.
+
+    ``np.bincount`` converts its input to ``intp`` first. Doing this one
+    block at a time keeps the temporary array in the cache.
+
+    Arguments:
+        d: numpy array of unsigned byte values.
+        nbins: Number of possible values.
+
+    Returns:
+        numpy array of nbins counts.
+    """
+    cnts = np.zeros(nbins, np.int64)
+    for j in range(0, len(d), CORRBLOCK):
+        cnts += np.bincount(d[j : j + CORRBLOCK], minlength=nbins)
+    return cnts
+
+
+WINDOWBLOCK = 4096
+RESYNC = 1024
+WINDOWTABLE = 1 << 16
+
+
+def windows(name, width, step, size=CHUNKSIZE, limit=None):
+    """
+    Calculate entropy, χ² and mean for windows in a file, in a single pass.
+
+    When windows overlap, the histogram is updated for the bytes that leave
+    and enter the window, and the sums needed for the statistics are only
+    updated for the counts that changed. The entropy is derived from Σc·log(c)
+    over the counts, using a table of c·log(c) for counts up to
+    ``WINDOWTABLE``; larger counts are calculated directly, see ``clogc``.
+    Since that sum is not exact, it is recalculated every ``RESYNC`` windows.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input.
+        width: Size of the windows in bytes.
+        step: Distance between the starts of successive windows.
+        size: Number of bytes to read at a time.
+        limit: Maximum number of bytes to read, or None to read to the end.
+
+    Yields:
+        Arrays of type ``WINDOWTYPE``, with up to ``WINDOWBLOCK`` windows each.
+    """
+    values = np.arange(256)
+    table = np.arange(min(width, WINDOWTABLE) + 1.0)
+    table[1:] *= np.log(table[1:])
+    logw = math.log(width)
+    rec = np.empty(WINDOWBLOCK, WINDOWTYPE)
+    k = 0
+    chunks = readchunks(name, size, limit=limit)
+    buf, end = np.empty(0, np.ubyte), 0
+    off, counts = 0, None
+    csum, sqsum, total = 0.0, 0, 0
+    while True:
+        incremental = counts is not None and step < width
+        keep = off - step if incremental else off
+        if end < off + width:
+            pieces = [buf[len(buf) - (end - keep) :]] if keep < end else []
+            pos = end
+            for chunk in chunks:
+                c = np.frombuffer(chunk, np.ubyte)
+                if pos + len(c) > keep:
+                    pieces.append(c[max(keep - pos, 0) :].copy())
+                pos += len(c)
+                if pos >= off + width:
+                    break
+            end = pos
+            buf = np.concatenate(pieces) if pieces else buf[:0]
+            if end < off + width:
+                break
+        base = end - len(buf)
+        if incremental:
+            gone = buf[off - step - base : off - base]
+            came = buf[off - step + width - base : off + width - base]
+            delta = np.bincount(came, minlength=256) - np.bincount(gone, minlength=256)
+            idx = np.flatnonzero(delta)
+            old = counts[idx]
+            new = old + delta[idx]
+            counts[idx] = new
+            csum += clogc(new, table) - clogc(old, table)
+            sqsum += int(new @ new - old @ old)
+            total += int(idx @ delta[idx])
+            if k % RESYNC == 0:
+                csum = clogc(counts, table)
+        else:
+            counts = histogram(buf[off - base : off + width - base])
+            csum = clogc(counts, table)
+            sqsum, total = int(counts @ counts), int(values @ counts)
+        ent = (logw - csum / width) / math.log(2)
+        rec[k % WINDOWBLOCK] = (off, ent, 256 * sqsum / width - width, total / width)
+        k += 1
+        if k % WINDOWBLOCK == 0:
+            yield rec
+            rec = np.empty(WINDOWBLOCK, WINDOWTYPE)
+        off += step
+    if k % WINDOWBLOCK:
+        yield rec[: k % WINDOWBLOCK]
+
+
+def clogc(counts, table):
+    """
+    Calculate Σc·log(c) over counts.
+
+    Arguments:
+        counts: numpy array of counts.
+        table: numpy array of c·log(c) for small values of c.
+
+    Returns:
+        The sum as a float.
+    """
+    big = counts >= len(table)
+    if not big.any():
+        return float(table[counts].sum())
+    c = counts[big].astype(float)
+    return float(table[counts[~big]].sum() + (c * np.log(c)).sum())
+
+
+def follow(name, size=CHUNKSIZE, every=None, seconds=None, limit=None, poll=0.5):
+    """
+    Accumulate the figures for a file that is still being written, a FIFO or
+    a device, and report them at intervals.
+
+    The file is read by a separate thread, so reading continues while the
+    statistics are calculated and printed. At the end of a regular file, it
+    is polled for new data like ``tail -f`` does. For other files the input
+    ends when reading returns no more data, or when the limit is reached.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input.
+        size: Number of bytes to read at a time.
+        every: Length of an interval in bytes, or None.
+        seconds: Length of an interval in seconds, or None.
+        limit: Maximum number of bytes to read, or None.
+        poll: Time to wait at the end of a regular file.
+
+    Yields:
+        (total, interval) tuples of NumpyAccumulators for all the bytes read
+        so far and for those of the last interval. They are only valid until
+        the next tuple is requested.
+    """
+    chunks = queue.Queue(16)
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=readstream, args=(name, size, chunks, stop, limit, poll), daemon=True
+    )
+    reader.start()
+    total, part = NumpyAccumulator(), NumpyAccumulator()
+    deadline = None if seconds is None else time.monotonic() + seconds
+    try:
+        while True:
+            try:
+                timeout = None
+                if deadline is not None:
+                    timeout = max(deadline - time.monotonic(), 0)
+                chunk = chunks.get(timeout=timeout)
+            except queue.Empty:
+                chunk = b""
+            if isinstance(chunk, Exception):
+                raise chunk
+            if chunk is None:
+                break
+            mv = memoryview(chunk)
+            while len(mv):
+                k = len(mv) if every is None else min(len(mv), every - part.n)
+                total.update(mv[:k])
+                part.update(mv[:k])
+                mv = mv[k:]
+                if part.n == every:
+                    yield total, part
+                    part = NumpyAccumulator(total.n)
+            if deadline is not None and time.monotonic() >= deadline:
+                if part.n:
+                    yield total, part
+                    part = NumpyAccumulator(total.n)
+                deadline = time.monotonic() + seconds
+        if part.n:
+            yield total, part
+    finally:
+        stop.set()
+
+
+def readstream(name, size, chunks, stop, limit=None, poll=0.5):
+    """
+    Read a file into a queue of chunks, for follow.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input.
+        size: Maximum number of bytes per chunk.
+        chunks: Queue to put the chunks in. At the end None is put in it, or
+            the exception that ended the reading.
+        stop: Event that stops the reading.
+        limit: Maximum number of bytes to read, or None.
+        poll: Time to wait at the end of a regular file.
+    """
+    try:
+        with openinput(name, buffering=0) as inf:
+            regular = stat.S_ISREG(os.fstat(inf.fileno()).st_mode)
+            while not stop.is_set() and (limit is None or limit > 0):
+                chunk = inf.read(size if limit is None else min(size, limit))
+                if chunk:
+                    if limit is not None:
+                        limit -= len(chunk)
+                    chunks.put(chunk)
+                elif regular:
+                    time.sleep(poll)
+                else:
+                    break
+        chunks.put(None)
+    except OSError as err:
+        chunks.put(err)
+
+
+def streamdata(name, size=CHUNKSIZE, limit=None, acc=None):
+    """
+    Read a file in chunks and accumulate the figures for the statistics.
+
+    Memory use is bounded by the chunk size.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input.
+        size: Number of bytes to read at a time.
+        limit: Maximum number of bytes to read, or None to read to the end.
+        acc: Empty accumulator to use, a new NumpyAccumulator by default.
+
+    Returns:
+        The accumulator for the contents of the file.
+    """
+    if acc is None:
+        acc = NumpyAccumulator()
+    for chunk in readchunks(name, size, limit=limit):
+        acc.update(chunk)
+    return acc
+
+
+def resume(name, size=CHUNKSIZE, bits=False):
+    """
+    Accumulate the figures for a file that only grows, e.g. a log or capture.
+
+    The state of the accumulator is kept in a sidecar file next to it. When
+    the file has the same inode and still ends the previous data with the
+    same bytes, only the part that was appended since is read. Otherwise the
+    whole file is read again; also when the statistics of the bits are wanted
+    but the saved state was made without them.
+
+    Arguments:
+        name: Path of the file to read
+        size: Number of bytes to read at a time.
+        bits: Also count what is needed for the statistics of the bits.
+
+    Returns:
+        A NumpyAccumulator for the contents of the file.
+    """
+    import json
+
+    statename = name + SIDECAR
+    st = os.stat(name)
+    ident = f"{st.st_dev}:{st.st_ino}"
+    acc = NumpyAccumulator(bits=bits)
+    try:
+        with open(statename) as inf:
+            saved = json.load(inf)
+        old = NumpyAccumulator.fromstate(saved["acc"])
+        usable = not bits or old.bitpairs is not None
+        if (
+            usable
+            and saved["ident"] == ident
+            and saved["tail"] == tailhash(name, old.n)
+        ):
+            acc = old
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    for chunk in readchunks(name, size, acc.n):
+        acc.update(chunk)
+    saved = {"ident": ident, "tail": tailhash(name, acc.n), "acc": acc.state()}
+    with open(statename + ".tmp", "w") as outf:
+        json.dump(saved, outf)
+    os.replace(statename + ".tmp", statename)
+    return acc
+
+
+def tailhash(name, end):
+    """
+    Hash the bytes of a file just before a position.
+
+    Arguments:
+        name: Path of the file to read
+        end: Position in the file.
+
+    Returns:
+        The SHA-256 hash of at most TAILCHECK bytes before end, as a hex
+        string. An empty string if the file is shorter than end.
+    """
+    import hashlib
+
+    start = max(end - TAILCHECK, 0)
+    with open(name, "rb") as inf:
+        inf.seek(start)
+        data = inf.read(end - start)
+    if len(data) != end - start:
+        return ""
+    return hashlib.sha256(data).hexdigest()
+
+
+def mapdata(name, size=CHUNKSIZE, bits=False):
+    """
+    Accumulate the figures for a file that is mapped into memory.
+
+    The statistics are calculated from the mapped pages, one block of
+    ``size`` bytes at a time. Apart from the histogram, only temporary arrays
+    of the size of a block are allocated.
+
+    Arguments:
+        name: Path of the file to read
+        size: Number of bytes to process at a time.
+        bits: Also count what is needed for the statistics of the bits.
+
+    Returns:
+        A NumpyAccumulator for the contents of the file.
+    """
+    total = os.path.getsize(name)
+    if not total:
+        return NumpyAccumulator(bits=bits)
+    return scanrange(name, 0, total, size, bits)
+
+
+def sample(name, nbytes=None, fraction=None, seed=0, block=SAMPLEBLOCK):
+    """
+    Estimate the statistics of a file from randomly placed blocks.
+
+    The blocks are chosen without replacement by a random generator with the
+    given seed, and read in order of position with ``pread``, so the whole
+    file never has to be read. The blocks are divided over at most
+    ``SAMPLEGROUPS`` groups, and the confidence intervals are derived from the
+    variance of the estimates that leave out one group (the jackknife).
+
+    Arguments:
+        name: Path of the file (or device) to read.
+        nbytes: Number of bytes to sample, rounded up to whole blocks.
+        fraction: Fraction of the blocks to sample, if nbytes is None.
+        seed: Seed for the selection of the blocks.
+        block: Size of the blocks in bytes.
+
+    Returns:
+        total: Size of the file in bytes.
+        est: Estimates (n, e, chi2, m, mc, scc) as from EntAccumulator.result,
+            where n is the number of sampled bytes.
+        hw: Half-widths of the 95% confidence intervals of e, chi2, m, mc and
+            scc. NaN if only one block was sampled.
+    """
+    fd = os.open(name, os.O_RDONLY)
+    try:
+        total = os.lseek(fd, 0, os.SEEK_END)
+        if not total:
+            raise ValueError("no data")
+        block = min(block, total)
+        nblocks = total // block
+        if nbytes is None:
+            nbytes = fraction * nblocks * block
+        k = min(max(math.ceil(nbytes / block), 1), nblocks)
+        groups = min(k, SAMPLEGROUPS)
+        # Per group: the counts, and the number of bytes, number of blocks,
+        # sum of products of successive bytes and the Monte Carlo figures.
+        counts = np.zeros((groups, 256), np.int64)
+        sums = np.zeros((groups, 5), np.int64)
+        picked = sorted(random.Random(seed).sample(range(nblocks), k))
+        for j, b in enumerate(picked):
+            acc = NumpyAccumulator().update(os.pread(fd, block, b * block))
+            counts[j % groups] += np.frombuffer(acc.counts, np.uint64).astype(np.int64)
+            sums[j % groups] += (acc.n, 1, acc.scct1, acc.inmont, acc.montec)
+    finally:
+        os.close(fd)
+    est = samplestats(counts.sum(axis=0), sums.sum(axis=0), nblocks * block)
+    est = (int(est[0]),) + tuple(float(v) for v in est[1:])
+    if groups < 2:
+        return total, est, (math.nan,) * 5
+    loo = samplestats(
+        counts.sum(axis=0) - counts, sums.sum(axis=0) - sums, nblocks * block
+    )
+    # χ² grows with the number of bytes, so scale it to the whole sample.
+    loo[2] *= est[0] / loo[0]
+    hw = tuple(Z95 * math.sqrt((groups - 1) * np.var(v)) for v in loo[1:])
+    return total, est, hw
+
+
+def samplestats(counts, sums, population):
+    """
+    Calculate the statistics for sampled blocks.
+
+    The entropy includes the Miller–Madow correction for the bias of an
+    entropy calculated from a sample, reduced for sampling without
+    replacement from a population of finite size. It vanishes when the whole
+    population is sampled. The serial correlation only uses the products of
+    successive bytes within the blocks.
+
+    Arguments:
+        counts: Array of byte counts, with the values on the last axis.
+        sums: Array of (bytes, blocks, products, inmont, montec) on the last
+            axis.
+        population: Number of bytes the blocks were sampled from.
+
+    Returns:
+        List of arrays of n, e, chi2, m, mc and scc.
+    """
+    n, nb, prod, inmont, montec = np.moveaxis(sums.astype(float), -1, 0)
+    p = counts / n[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        e = -np.sum(np.where(p > 0, p * np.log2(p), 0), axis=-1)
+        e += (
+            (np.count_nonzero(counts, axis=-1) - 1)
+            * (1 / n - 1 / population)
+            / (2 * math.log(2))
+        )
+        chi2 = 256 * n * np.sum((p - 1 / 256) ** 2, axis=-1)
+        v = np.arange(256.0)
+        m = p @ v
+        scc = (prod / (n - nb) - m * m) / (p @ (v * v) - m * m)
+        mc = 4 * inmont / montec
+    return [n, e, chi2, m, mc, scc]
+
+
+def verdict(name, size=CHUNKSIZE, limit=None):
+    """
+    Determine if a file looks random, reading only as much as needed.
+
+    The data is read in pieces of increasing size, starting at
+    ``VERDICTSTART`` bytes and doubling up to the chunk size. After every
+    piece, the test of ``sequential`` is applied to all data read so far.
+    If it does not come to a conclusion before the end of the data, the
+    verdict of the χ² test in the normal output is used; “suspected of being
+    not random” and “close to random, but not perfect” then become “suspect”.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input.
+        size: Maximum number of bytes to read at a time.
+        limit: Maximum number of bytes to read, or None to read to the end.
+
+    Returns:
+        A (code, n) tuple. The code is 0 if the data looks random, 1 if it is
+        almost certainly not random, 3 if it is suspect and 4 if there is no
+        data. The number of bytes read is n.
+    """
+    acc = NumpyAccumulator()
+    look = min(VERDICTSTART, size)
+    view = memoryview(bytearray(size))
+    with openinput(name) as inf:
+        while limit is None or acc.n < limit:
+            want = look - acc.n if limit is None else min(look, limit) - acc.n
+            k = inf.readinto(view[:want])
+            if not k:
+                break
+            acc.update(view[:k])
+            if acc.n == look:
+                code = sequential(acc)
+                if code is not None:
+                    return code, acc.n
+                look += min(look, size)
+    if not acc.n:
+        return 4, 0
+    d = math.fabs(pochisq(acc.chisquare()) * 100 - 50)
+    return (0 if d <= 40 else 1 if d > 49 else 3), acc.n
+
+
+def sequential(acc):
+    """
+    Sequential test for the randomness of the data read so far.
+
+    Since this test is repeated while the data is read, a very small false
+    alarm probability ``VERDICTALPHA`` is used for each look. The data is
+    rejected when the χ² value, or the equivalent statistic 2n·ln(2)·(8 − e)
+    derived from the entropy e, is too large for random data, or when the χ²
+    value is too small (too uniform). The data is accepted when both are so
+    small that an entropy deficit of ``VERDICTDEFICIT`` bits per byte or more
+    can be ruled out. Under that alternative, the statistics have a
+    non-central χ² distribution with non-centrality λ = 2n·ln(2)·deficit,
+    approximated by a normal distribution.
+
+    Arguments:
+        acc: EntAccumulator for the data read so far.
+
+    Returns:
+        0 if the data looks random, 1 if it is not random, or None if no
+        conclusion can be drawn yet.
+    """
+    chi2 = acc.chisquare()
+    g = 2 * acc.n * math.log(2) * (8 - acc.entropy())
+    p = pochisq(chi2)
+    if p < VERDICTALPHA or p > 1 - VERDICTALPHA or pochisq(g) < VERDICTALPHA:
+        return 1
+    lam = 2 * acc.n * math.log(2) * VERDICTDEFICIT
+    if max(chi2, g) < 255 + lam - VERDICTZ * math.sqrt(2 * (255 + 2 * lam)):
+        return 0
+    return None
+
+
+def parallel(name, jobs, size=CHUNKSIZE, bits=False):
+    """
+    Analyse a file with several processes.
+
+    The file is split into byte ranges, one per process. Every process maps
+    the file into memory and returns a NumpyAccumulator for its range. These
+    are merged in order, which joins the ranges at their boundaries.
+
+    Arguments:
+        name: Path of the file to read
+        jobs: Number of processes to use.
+        size: Number of bytes to process at a time.
+        bits: Also count what is needed for the statistics of the bits.
+
+    Returns:
+        A NumpyAccumulator for the contents of the file.
+    """
+    import concurrent.futures as cf
+
+    total = os.path.getsize(name)
+    bounds = [total * j // jobs for j in range(jobs + 1)]
+    acc = NumpyAccumulator(bits=bits)
+    if not total:
+        return acc
+    with cf.ProcessPoolExecutor(jobs) as ex:
+        parts = [
+            ex.submit(scanrange, name, start, end, size, bits)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        for part in parts:
+            acc.merge(part.result())
+    return acc
+
+
+def scanrange(name, start, end, size=CHUNKSIZE, bits=False):
+    """
+    Accumulate the figures for a range of bytes from a memory-mapped file.
+
+    Arguments:
+        name: Path of the file to read
+        start: Offset of the first byte of the range.
+        end: Offset just past the last byte of the range.
+        size: Number of bytes to process at a time.
+        bits: Also count what is needed for the statistics of the bits.
+
+    Returns:
+        A NumpyAccumulator for the range.
+    """
+    acc = NumpyAccumulator(start, bits)
+    with open(name, "rb") as inf:
+        with mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            data = np.frombuffer(mm, np.ubyte)
+            for j in range(start, end, size):
+                acc.update(data[j : min(j + size, end)])
+            del data
+    return acc
+
+
 def entropy(counts):
     """
     Calculate the entropy of the data represented by the counts array.
 
     Arguments:
-        counts: numpy array of counts for all byte values.
+        counts: numpy array of counts for all byte (or symbol) values.
 
     Returns:
-        Entropy in bits per byte.
+        Entropy in bits per byte (or symbol).
     """
     counts = np.trim_zeros(np.sort(counts))
-    sz = sum(counts)
+    sz = counts.sum()
     p = counts / sz
-    ent = -sum(p * np.log(p) / math.log(256))
+    ent = -(p * np.log(p) / math.log(256)).sum()
     return ent * 8
 
 
-def pearsonchisquare(counts):
+def pearsonchisquare(counts, nbins=256):
     """
     Calculate Pearson's χ² (chi square) test for an array of bytes.
 
     See [http://en.wikipedia.org/wiki/Pearson%27s_chi-squared_test
     #Discrete_uniform_distribution]
 
+    Values that are missing from a sparse counts array each add the expected
+    count to χ².
+
     Arguments:
         counts: Numpy array of counts.
+        nbins: Number of possible values.
 
     Returns:
         χ² value
     """
-    np = sum(counts) / 256
-    return sum((counts - np) ** 2 / np)
+    np = counts.sum() / nbins
+    return ((counts - np) ** 2 / np).sum() + (nbins - len(counts)) * np
 
 
 def correlation(d):
@@ -168,17 +1471,17 @@ def correlation(d):
     Calculate the serial correlation coefficient of the data.
 
     Arguments:
-        d: numpy array of unsigned byte values.
+        d: numpy array of unsigned byte (or symbol) values.
 
     Returns:
         Serial correlation coeffiecient.
     """
     totalc = len(d)
-    a = np.array(d, np.float64)
-    b = np.roll(a, -1)
-    scct1 = np.sum(a * b)
-    scct2 = np.sum(a) ** 2
-    scct3 = np.sum(a * a)
+    if not totalc:
+        raise ValueError
+    scct1, scct2, scct3 = serialsums(d)
+    scct1 += int(d[-1]) * int(d[0])
+    scct2 = scct2**2
     scc = totalc * scct3 - scct2
     if scc == 0:
         raise ValueError
@@ -186,6 +1489,157 @@ def correlation(d):
     return scc
 
 
+CORRBLOCK = 65536
+
+
+def serialsums(d):
+    """
+    Calculate the sums needed for the serial correlation coefficient.
+
+    The data is processed in blocks of CORRBLOCK bytes. Each block is
+    converted to int64 once, and the three sums are calculated from it while
+    it is in the cache. Successive blocks overlap by one byte for the
+    products. The sums are accumulated as Python integers, so they are exact
+    for any size of data.
+
+    32-bit symbols are split into 16-bit halves, so that the sums of the
+    partial products of a block fit in int64 as well.
+
+    Arguments:
+        d: numpy array of unsigned byte (or symbol) values.
+
+    Returns:
+        The sum of the products of successive bytes (without the wrap-around
+        from the last to the first byte), the sum of the bytes and the sum of
+        their squares.
+    """
+    if d.itemsize > 2:
+        return widesums(d)
+    prod, total, squares = 0, 0, 0
+    for j in range(0, len(d), CORRBLOCK):
+        a = d[j : j + CORRBLOCK + 1].astype(np.int64)
+        prod += int(np.dot(a[:-1], a[1:]))
+        a = a[:CORRBLOCK]
+        total += int(a.sum())
+        squares += int(np.dot(a, a))
+    return prod, total, squares
+
+
+def productsum(d):
+    """
+    Calculate only the sum of the products of successive bytes.
+
+    This is the part of ``serialsums`` that cannot be derived from the
+    histogram. The blocks are converted to float64 so that the dot product
+    can use BLAS. This is exact, because the sum for a block of CORRBLOCK
+    bytes is far below 2⁵³.
+
+    Arguments:
+        d: numpy array of unsigned byte values.
+
+    Returns:
+        The sum of the products of successive bytes (without the wrap-around
+        from the last to the first byte).
+    """
+    prod = 0
+    for j in range(0, len(d) - 1, CORRBLOCK):
+        a = d[j : j + CORRBLOCK + 1].astype(np.float64)
+        prod += int(np.dot(a[:-1], a[1:]))
+    return prod
+
+
+def widesums(d):
+    """
+    Calculate the sums of ``serialsums`` for 32-bit symbols.
+
+    Arguments:
+        d: numpy array of unsigned 32-bit values.
+
+    Returns:
+        The same three sums as ``serialsums``.
+    """
+    prod, total, squares = 0, 0, 0
+    for j in range(0, len(d), CORRBLOCK):
+        a = d[j : j + CORRBLOCK + 1].astype(np.int64)
+        hi, lo = a >> 16, a & 0xFFFF
+        prod += int(np.dot(hi[:-1], hi[1:])) << 32
+        prod += int(np.dot(hi[:-1], lo[1:]) + np.dot(lo[:-1], hi[1:])) << 16
+        prod += int(np.dot(lo[:-1], lo[1:]))
+        a, hi, lo = a[:CORRBLOCK], hi[:CORRBLOCK], lo[:CORRBLOCK]
+        total += int(a.sum())
+        squares += (int(np.dot(hi, hi)) << 32) + (int(np.dot(hi, lo)) << 17)
+        squares += int(np.dot(lo, lo))
+    return prod, total, squares
+
+
+def bitpairs(d):
+    """
+    Count the bytes with bit 0 set that are followed by a byte with bit 7
+    set. These are the pairs of successive 1 bits between the bytes.
+
+    Arguments:
+        d: numpy array of unsigned byte values.
+
+    Returns:
+        The number of pairs.
+    """
+    pairs = 0
+    for j in range(0, len(d), CORRBLOCK):
+        a = d[j : j + CORRBLOCK + 1]
+        pairs += int(np.count_nonzero(a[:-1] & (a[1:] >> 7)))
+    return pairs
+
+
+PAIRBLOCK = 1 << 18
+
+
+def paircounts(d):
+    """
+    Count the pairs of successive bytes.
+
+    The data is processed in blocks of PAIRBLOCK bytes that overlap by one
+    byte, so the temporary arrays do not grow with the size of the data.
+
+    Arguments:
+        d: numpy array of unsigned byte values.
+
+    Returns:
+        numpy array of 65536 counts, indexed by 256 × first + second byte.
+    """
+    counts = np.zeros(65536, np.int64)
+    for j in range(0, len(d) - 1, PAIRBLOCK):
+        a = d[j : j + PAIRBLOCK + 1]
+        counts += np.bincount((a[:-1].astype(np.uint16) << 8) | a[1:], minlength=65536)
+    return counts
+
+
+def pairstats(pairs):
+    """
+    Calculate the statistics of the pairs of successive bytes.
+
+    The pairs overlap, so they are not independent. The χ² value therefore
+    only approximately follows the distribution for 65535 degrees of freedom.
+
+    Arguments:
+        pairs: numpy array of 65536 counts, as returned by ``paircounts``.
+
+    Returns:
+        n: Number of pairs.
+        e: Entropy in bits per pair.
+        cond: Conditional entropy of a byte given the previous byte, in bits.
+        chi2: Χ² value.
+        p: Probability of the χ² value.
+    """
+    n = int(pairs.sum())
+    if not n:
+        raise ValueError("no pairs")
+    e = entropy(pairs)
+    # H(Xₙ|Xₙ₋₁) = H(Xₙ₋₁, Xₙ) − H(Xₙ₋₁)
+    cond = e - entropy(pairs.reshape(256, 256).sum(axis=1))
+    chi2 = pearsonchisquare(pairs, 65536)
+    return n, e, cond, chi2, pochisq(chi2, 65535)
+
+
 def pochisq(x, df=255):
     """
     Compute probability of χ² test value.
@@ -209,68 +1663,251 @@ def pochisq(x, df=255):
 
     Returns:
         The degree to which the sequence tested is suspected of being
-        non-random.
+        non-random. A float for a single χ² value, an array otherwise.
     """
-    # Check arguments first
     if not isinstance(df, int):
         raise ValueError("df must be an integer")
-    if x <= 0.0 or df < 1:
-        return 1.0
-    # Constants
+    if np.ndim(x) == 0:
+        return pochisqcached(float(x), df)
+    return pochisqarray(x, df)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def pochisqcached(x, df):
+    """
+    Cached version of ``pochisq`` for a single χ² value.
+
+    The key is the exact value of x; rounding it would change the results.
+    """
+    return float(pochisqarray(np.array([x]), df)[0])
+
+
+POCHISQBLOCK = 1 << 20
+POCHISQMAXDF = 1 << 20
+
+
+def pochisqarray(x, df):
+    """
+    Compute the probabilities of an array of χ² values.
+
+    The terms of the series are calculated for blocks of χ² values, with
+    blocks of about ``POCHISQBLOCK`` terms. For more than ``POCHISQMAXDF``
+    degrees of freedom (e.g. 32-bit symbols) the series is too long, and the
+    Wilson–Hilferty approximation is used instead.
+
+    Arguments:
+        x: Array of χ² values.
+        df: Degrees of freedom.
+
+    Returns:
+        An array of probabilities with the same shape as x.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    p = np.ones(x.shape)
+    valid = x > 0.0
+    if df < 1 or not valid.any():
+        return p
+    if df > POCHISQMAXDF:
+        h = 2 / (9 * df)
+        z = (np.cbrt(x[valid] / df) - (1 - h)) / math.sqrt(2 * h)
+        p[valid] = [0.5 * math.erfc(j) for j in z]
+        return p
+    a = 0.5 * x[valid]
+    if df % 2 == 0:
+        s = np.exp(-a)
+    else:
+        s = np.array([math.erfc(math.sqrt(j)) for j in a])
+    z, e = pochisqterms(df)
+    if len(z):
+        loga = np.log(a)
+        rows = max(POCHISQBLOCK // len(z), 1)
+        for j in range(0, len(a), rows):
+            blk = slice(j, j + rows)
+            terms = np.multiply.outer(loga[blk], z) - a[blk, np.newaxis] - e
+            s[blk] += np.exp(terms).sum(axis=1)
+    p[valid] = s
+    return p
+
+
+@functools.cache
+def pochisqterms(df):
+    """
+    Calculate the parts of the terms of the series in ``pochisq`` that only
+    depend on the degrees of freedom.
+
+    Term k of the series is exp(z[k]·log(a) − a − e[k]), where a is half the
+    χ² value.
+
+    Arguments:
+        df: Degrees of freedom.
+
+    Returns:
+        The arrays z and e.
+    """
     LOG_SQRT_PI = 0.5723649429247000870717135  # log(√π)
-    I_SQRT_PI = 0.5641895835477562869480795  # 1/√π
-    BIGX = 20.0
-    a = 0.5 * x
     even = df % 2 == 0
-    if df > 1:
-        y = math.exp(-a)
-    nd = stat.NormalDist()
-    s = y if even else 2.0 * nd.cdf(-math.sqrt(x))
-    if df > 2:
-        x = 0.5 * (df - 1.0)
-        z = 1.0 if even else 0.5
-        if a > BIGX:
-            e = 0 if even else LOG_SQRT_PI
-            c = math.log(a)
-            while z <= x:
-                e = math.log(z) + e
-                s += math.exp(c * z - a - e)
-                z += 1.0
-            return s
-        else:
-            e = 1.0 if even else I_SQRT_PI / math.sqrt(a)
-            c = 0.0
-            while z <= x:
-                e = e * a / z
-                c = c + e
-                z += 1.0
-            return c * y + s
-    else:
-        return s
+    z = np.arange(1.0 if even else 0.5, 0.5 * (df - 1.0) + 0.25, 1.0)
+    e = np.cumsum(np.log(z)) + (0.0 if even else LOG_SQRT_PI)
+    return z, e
 
 
-def monte_carlo(d):
+def monte_carlo(d, lut=True):
     """
     Calculate Monte Carlo value for π.
 
     Arguments:
         d: numpy array of unsigned byte values.
+        lut: Use a lookup table to classify most points.
 
     Returns:
-        Approximation of π
+        Approximation of π, NaN if there are less than six bytes.
     """
     MONTEN = 6
-    incirc = (256.0 ** (MONTEN // 2) - 1) ** 2
-    d = np.array(d, copy=True, dtype=np.float64)
-    d = d[: len(d) // MONTEN * MONTEN]
-    values = np.sum(d.reshape((-1, MONTEN // 2)) * np.array([256 ** 2, 256, 1]), axis=1)
-    montex = values[0::2]
-    montey = values[1::2]
-    dist2 = montex * montex + montey * montey
-    inmont = np.count_nonzero(dist2 <= incirc)
-    montepi = 4 * inmont / len(montex)
+    points = len(d) // MONTEN
+    if not points:
+        return math.nan
+    inmont = montecount(d[: points * MONTEN], lut)
+    montepi = 4 * inmont / points
     return montepi
 
 
+@functools.cache
+def montelut():
+    """
+    Create a lookup table that classifies Monte Carlo points by the most
+    significant bytes of their coordinates.
+
+    The table is made when it is first needed.
+
+    Returns:
+        numpy array of 65536 bytes, indexed by 256 times the high byte of x
+        plus the high byte of y; 1 if every point with these high bytes is
+        inside the circle, 0 if every point is outside, and 2 otherwise.
+    """
+    incirc = (256**3 - 1) ** 2
+    lo = np.arange(256, dtype=np.int64) << 16
+    hi = lo + 0xFFFF
+    lo2, hi2 = lo * lo, hi * hi
+    inside = hi2[:, np.newaxis] + hi2 <= incirc
+    outside = lo2[:, np.newaxis] + lo2 > incirc
+    return np.where(inside, 1, np.where(outside, 0, 2)).astype(np.ubyte).ravel()
+
+
+MONTEBLOCK = 65536
+
+
+def montecount(d, lut=True):
+    """
+    Count the Monte Carlo points inside the circle, using integers only.
+
+    The points are processed in blocks of MONTEBLOCK, so the temporary
+    arrays stay small enough to fit in the cache. The coordinates are
+    assembled as 24-bit unsigned integers from strided views of the bytes,
+    and the squared distance is calculated with 64-bit unsigned integers.
+
+    Arguments:
+        d: numpy array of unsigned byte values, length a multiple of 6.
+        lut: Use the table from ``montelut`` to classify most points without
+            multiplication.
+
+    Returns:
+        Number of points inside the circle.
+    """
+    incirc = np.uint64((256**3 - 1) ** 2)
+    points = d.reshape((-1, 6))
+    table = montelut() if lut else None
+    inmont = 0
+    for j in range(0, len(points), MONTEBLOCK):
+        p = points[j : j + MONTEBLOCK]
+        if lut:
+            key = p[:, 0].astype(np.uint16) << 8
+            key |= p[:, 3]
+            cls = table.take(key)
+            inmont += int(np.count_nonzero(cls == 1))
+            p = p[np.flatnonzero(cls == 2)]
+        x = p[:, 0].astype(np.uint32) << 16
+        x |= p[:, 1].astype(np.uint32) << 8
+        x |= p[:, 2]
+        y = p[:, 3].astype(np.uint32) << 16
+        y |= p[:, 4].astype(np.uint32) << 8
+        y |= p[:, 5]
+        x = x.astype(np.uint64)
+        y = y.astype(np.uint64)
+        x *= x
+        y *= y
+        x += y
+        inmont += int(np.count_nonzero(x <= incirc))
+    return inmont
+
+
+class NumpyAccumulator(EntAccumulator):
+    """
+    EntAccumulator that uses the compiled kernel to process the buffers in a
+    single pass, or numpy if the kernel is not available.
+
+    Unlike EntAccumulator, it only counts the pairs needed for ``bitresult``
+    when it is created with ``bits=True``, since that takes an extra pass
+    over the data with numpy.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, offset=0, bits=False):
+        super().__init__(offset, bits)
+
+    def _scan(self, mv, start, end):
+        if ent_kernel is not None:
+            with stage("kernel", len(mv)):
+                return ent_kernel.scan(mv, self.counts, start, end)
+        d = np.frombuffer(mv, np.ubyte)
+        cnts = np.frombuffer(self.counts, np.uint64)
+        with stage("histogram", len(d)):
+            cnts += histogram(d).astype(np.uint64)
+        with stage("productsum", len(d)):
+            prod = productsum(d)
+        pairs = 0
+        if self.bitpairs is not None:
+            with stage("bitpairs", len(d)):
+                pairs = bitpairs(d)
+        with stage("montecount", end - start):
+            inside = montecount(d[start:end])
+        return prod, pairs, inside
+
+    @staticmethod
+    def _montecount(mv):
+        return montecount(np.frombuffer(mv, np.ubyte))
+
+
+class PairAccumulator(NumpyAccumulator):
+    """
+    NumpyAccumulator that also counts the pairs of successive bytes in
+    ``pairs``, for ``pairstats``.
+    """
+
+    __slots__ = ("pairs",)
+
+    def __init__(self, offset=0, bits=False):
+        super().__init__(offset, bits)
+        self.pairs = np.zeros(65536, np.uint64)
+
+    def merge(self, other):
+        last = self.last
+        super().merge(other)
+        if other.n and last is not None:
+            self.pairs[last << 8 | other.first] += 1
+        self.pairs += other.pairs
+        return self
+
+    def _scan(self, mv, start, end):
+        # The update method sets last after the scan, so here it is still the
+        # byte before the buffer.
+        d = np.frombuffer(mv, np.ubyte)
+        if self.last is not None:
+            self.pairs[self.last << 8 | int(d[0])] += 1
+        with stage("paircounts", len(d)):
+            self.pairs += paircounts(d).astype(np.uint64)
+        return super()._scan(mv, start, end)
+
+
 if __name__ == "__main__":
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,621 @@
+# file: ent_accumulator.py
+# vim:fileencoding=utf-8:fdm=marker:ft=python
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T10:31:12+0200
+# Last modified: 2026-10-18T00:41:27+0200
+"""
+Incremental calculation of the figures reported by ‘ent’.
+
+This module only uses the standard library. It is shared by ent.py and
+ent_without_numpy.py, so both produce the same results when data is
+processed in pieces. The reading, scanning and derivation of the statistics
+are marked as stages for ``ent_profile``.
+"""
+
+import array
+import functools
+import math
+import sys
+from ent_profile import stage
+
+CHUNKSIZE = 1 << 20
+MONTEN = 6
+INCIRC = (256 ** (MONTEN // 2) - 1) ** 2
+
+
+class EntAccumulator:
+    """
+    Accumulate the statistics of a byte stream one buffer at a time.
+
+    The same figures also give the statistics of the stream as a sequence of
+    bits, most significant bit first, see ``bitresult``. For that, the number
+    of bytes with bit 0 set that are followed by a byte with bit 7 set is
+    kept in ``bitpairs``. It is None for an accumulator that does not count
+    them.
+
+    An accumulator covers a contiguous segment of a stream, starting at
+    ``offset``. Monte Carlo points are made from groups of six bytes aligned
+    to the start of the stream. The bytes before the first aligned group are
+    kept in ``mchead``, those of an incomplete last group in ``mctail``.
+    Together with ``first`` and ``last`` this is enough to merge the
+    accumulators of adjacent segments.
+
+    Subclasses can replace the methods ``_scan`` and ``_montecount`` that do
+    the actual work on a buffer.
+    """
+
+    __slots__ = (
+        "offset",
+        "n",
+        "counts",
+        "scct1",
+        "bitpairs",
+        "first",
+        "last",
+        "mchead",
+        "mctail",
+        "inmont",
+        "montec",
+    )
+
+    def __init__(self, offset=0, bits=True):
+        """
+        Create an empty accumulator.
+
+        Arguments:
+            offset: Position of the first byte of this segment in the stream.
+            bits: Count the pairs needed for ``bitresult``.
+        """
+        self.offset = offset
+        self.n = 0
+        self.counts = array.array("Q", bytes(8 * 256))
+        self.scct1 = 0
+        self.bitpairs = 0 if bits else None
+        self.first = None
+        self.last = None
+        self.mchead = b""
+        self.mctail = b""
+        self.inmont = 0
+        self.montec = 0
+
+    def update(self, buf):
+        """
+        Add the contents of a buffer to the accumulated figures.
+
+        Arguments:
+            buf: bytes-like object (including numpy arrays of unsigned bytes).
+
+        Returns:
+            The accumulator itself.
+        """
+        mv = memoryview(buf).cast("B")
+        if not len(mv):
+            return self
+        if self.last is None:
+            self.first = mv[0]
+        else:
+            self.scct1 += self.last * mv[0]
+        if self.last is not None and self.bitpairs is not None:
+            self.bitpairs += self.last & mv[0] >> 7
+        start, end = self._monteedges(mv)
+        prod, pairs, inmont = self._scan(mv, start, end)
+        self.scct1 += prod
+        if self.bitpairs is not None:
+            self.bitpairs += pairs
+        self.inmont += inmont
+        self.montec += (end - start) // MONTEN
+        self.last = mv[-1]
+        self.n += len(mv)
+        return self
+
+    def merge(self, other):
+        """
+        Add the figures of the segment that directly follows this one.
+
+        Arguments:
+            other: EntAccumulator for the next segment of the stream.
+
+        Returns:
+            The accumulator itself.
+        """
+        if other.offset != self.offset + self.n:
+            raise ValueError("segments are not adjacent")
+        if not other.n:
+            return self
+        if self.bitpairs is None or other.bitpairs is None:
+            self.bitpairs = None
+        elif self.last is not None:
+            self.bitpairs += (self.last & other.first >> 7) + other.bitpairs
+        else:
+            self.bitpairs = other.bitpairs
+        if self.last is None:
+            self.first = other.first
+        else:
+            self.scct1 += self.last * other.first
+        for j, c in enumerate(other.counts):
+            self.counts[j] += c
+        self.scct1 += other.scct1
+        self.last = other.last
+        mv = memoryview(other.mchead)
+        start, end = self._monteedges(mv)
+        self.inmont += self._montecount(mv[start:end])
+        self.montec += (end - start) // MONTEN
+        if other.n >= -other.offset % MONTEN:
+            self.inmont += other.inmont
+            self.montec += other.montec
+            self.mctail = other.mctail
+        self.n += other.n
+        return self
+
+    def state(self):
+        """
+        Return the accumulated figures as a dictionary of plain values, that
+        can be stored as JSON.
+        """
+        return {
+            "offset": self.offset,
+            "n": self.n,
+            "counts": self.counts.tolist(),
+            "scct1": int(self.scct1),
+            "bitpairs": None if self.bitpairs is None else int(self.bitpairs),
+            "first": self.first,
+            "last": self.last,
+            "mchead": self.mchead.hex(),
+            "mctail": self.mctail.hex(),
+            "inmont": int(self.inmont),
+            "montec": self.montec,
+        }
+
+    @classmethod
+    def fromstate(cls, state):
+        """
+        Create an accumulator from the figures returned by ``state``.
+
+        Arguments:
+            state: Dictionary as returned by ``state``.
+
+        Returns:
+            A new accumulator.
+        """
+        acc = cls(state["offset"], state["bitpairs"] is not None)
+        if len(state["counts"]) != 256:
+            raise ValueError("invalid accumulator state")
+        acc.counts = array.array("Q", state["counts"])
+        for key in ("n", "scct1", "bitpairs", "first", "last", "inmont", "montec"):
+            setattr(acc, key, state[key])
+        acc.mchead = bytes.fromhex(state["mchead"])
+        acc.mctail = bytes.fromhex(state["mctail"])
+        return acc
+
+    def mean(self):
+        """Return the arithmetic mean of the bytes."""
+        return sum(j * c for j, c in enumerate(self.counts)) / self.n
+
+    def entropy(self):
+        """Return the entropy in bits per byte."""
+        p = [c / self.n for c in self.counts if c]
+        c = math.log(256)
+        ent = -sum(n * math.log(n) / c for n in p)
+        return ent * 8
+
+    def chisquare(self):
+        """Return Pearson's χ² value for the byte counts."""
+        np = self.n / 256
+        return sum((c - np) ** 2 / np for c in self.counts)
+
+    def correlation(self):
+        """
+        Return the serial correlation coefficient.
+
+        Raises ValueError if the coefficient is undefined.
+        """
+        scct2 = sum(j * c for j, c in enumerate(self.counts)) ** 2
+        scct3 = sum(j * j * c for j, c in enumerate(self.counts))
+        scct1 = self.scct1 + self.last * self.first
+        scc = self.n * scct3 - scct2
+        if scc == 0:
+            raise ValueError
+        scc = (self.n * scct1 - scct2) / scc
+        return scc
+
+    def montepi(self):
+        """Return the Monte Carlo approximation of π (NaN without points)."""
+        if not self.montec:
+            return math.nan
+        return 4 * self.inmont / self.montec
+
+    def result(self):
+        """
+        Calculate the statistics from the accumulated figures.
+
+        Returns:
+            n: Number of bytes.
+            e: Entropy in bits per byte.
+            chi2: Χ² value.
+            m: Arithmetic mean.
+            mc: Monte Carlo approximation of π.
+            scc: Serial correlation coefficient, or None if undefined.
+        """
+        if not self.n:
+            raise ValueError("no data")
+        try:
+            scc = self.correlation()
+        except ValueError:
+            scc = None
+        return (
+            self.n,
+            self.entropy(),
+            self.chisquare(),
+            self.mean(),
+            self.montepi(),
+            scc,
+        )
+
+    def bitcounts(self):
+        """Return the number of 0 and 1 bits."""
+        ones = sum(c * popcount(j) for j, c in enumerate(self.counts))
+        return 8 * self.n - ones, ones
+
+    def bitresult(self):
+        """
+        Calculate the statistics for the stream as a sequence of bits.
+
+        As in the original ``ent -b``, the Monte Carlo value is calculated
+        from the bytes.
+
+        Returns:
+            n: Number of bits.
+            e: Entropy in bits per bit.
+            chi2: Χ² value, for one degree of freedom.
+            m: Arithmetic mean.
+            mc: Monte Carlo approximation of π.
+            scc: Serial correlation coefficient, or None if undefined.
+        """
+        if not self.n:
+            raise ValueError("no data")
+        if self.bitpairs is None:
+            raise ValueError("the bit pairs were not counted")
+        n = 8 * self.n
+        cnts = self.bitcounts()
+        ones = cnts[1]
+        e = -sum(c / n * math.log2(c / n) for c in cnts if c)
+        chi2 = sum((c - n / 2) ** 2 / (n / 2) for c in cnts)
+        # Pairs of successive 1 bits: inside the bytes, between the bytes and
+        # between the last and the first bit.
+        scct1 = sum(c * popcount(j & j >> 1) for j, c in enumerate(self.counts))
+        scct1 += self.bitpairs + (self.last & self.first >> 7)
+        scc = n * ones - ones * ones
+        scc = (n * scct1 - ones * ones) / scc if scc else None
+        return n, e, chi2, ones / n, self.montepi(), scc
+
+    def _monteedges(self, mv):
+        """
+        Handle the incomplete Monte Carlo groups at the edges of a buffer.
+
+        Bytes are added to ``mchead`` or used to complete ``mctail`` first.
+        The bytes after the last complete group become the new ``mctail``.
+
+        Arguments:
+            mv: memoryview of the bytes following the current position.
+
+        Returns:
+            The start and end of the complete groups in the buffer.
+        """
+        start = 0
+        h = -self.offset % MONTEN
+        if self.n < h:
+            start = min(h - self.n, len(mv))
+            self.mchead += bytes(mv[:start])
+        if self.mctail:
+            k = min(start + MONTEN - len(self.mctail), len(mv))
+            self.mctail += bytes(mv[start:k])
+            start = k
+            if len(self.mctail) < MONTEN:
+                return start, start
+            self.inmont += self._montecount(memoryview(self.mctail))
+            self.montec += 1
+        end = start + (len(mv) - start) // MONTEN * MONTEN
+        self.mctail = bytes(mv[end:])
+        return start, end
+
+    def _scan(self, mv, start, end):
+        """
+        Process a buffer; add its byte counts to ``counts``.
+
+        Arguments:
+            mv: memoryview of the bytes.
+            start, end: Range of complete Monte Carlo groups in the buffer.
+
+        Returns:
+            The sum of the products of successive bytes in the buffer, the
+            number of bytes with bit 0 set followed by a byte with bit 7 set
+            (ignored if ``bitpairs`` is None), and the number of Monte Carlo
+            points inside the circle in mv[start:end].
+        """
+        prod, pairs = 0, 0
+        with stage("scan", len(mv)):
+            for j in range(0, len(mv), BLOCKSIZE):
+                d = bytes(mv[j : j + BLOCKSIZE + 1])
+                planes = bitplanes(d[:BLOCKSIZE])
+                for k, c in enumerate(histogram(planes, min(len(d), BLOCKSIZE))):
+                    self.counts[k] += c
+                prod += serialproducts(planes)
+                pairs += popcount(planes[0] & planes[7] >> 1)
+                if len(d) > BLOCKSIZE:
+                    prod += d[-2] * d[-1]
+                    pairs += d[-2] & d[-1] >> 7
+        with stage("montecount", end - start):
+            inside = self._montecount(mv[start:end])
+        return prod, pairs, inside
+
+    @staticmethod
+    def _montecount(mv):
+        """
+        Return the number of Monte Carlo points inside the circle for a buffer
+        whose length is a multiple of six.
+        """
+        return montecount(mv)
+
+
+BLOCKSIZE = 1 << 20
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:  # Python 3.9
+
+    def popcount(x):
+        """Return the number of 1 bits in a non-negative integer."""
+        return bin(x).count("1")
+
+
+@functools.cache
+def bittables():
+    """
+    Create the translation tables for ``bitplanes``.
+
+    Returns:
+        A list of lists; table [k][m] translates a byte to its bit k, shifted
+        left by m.
+    """
+    return [
+        [bytes(((b >> k) & 1) << m for b in range(256)) for m in range(8)]
+        for k in range(8)
+    ]
+
+
+def bitplanes(d):
+    """
+    Split bytes into bit planes.
+
+    Every eighth byte is taken with a slice and translated so that the
+    required bit ends up in the right position. Converting those to integers
+    and adding them packs the bits without a loop over the bytes in Python.
+
+    Arguments:
+        d: bytes
+
+    Returns:
+        A list of 8 integers. Bit i of integer k is bit k of d[i].
+    """
+    slices = [d[m::8] for m in range(8)]
+    return [
+        sum(int.from_bytes(s.translate(t[m]), "little") for m, s in enumerate(slices))
+        for t in bittables()
+    ]
+
+
+def histogram(planes, n):
+    """
+    Count the occurrence of each byte value from the bit planes.
+
+    Starting from a mask of all n positions, the positions are split on bit
+    7, then on bit 6, et cetera. After splitting on bit 0, the number of set
+    bits in a mask is the count for one byte value.
+
+    Arguments:
+        planes: Bit planes as produced by ``bitplanes``.
+        n: Number of bytes.
+
+    Returns:
+        A list of 256 counts.
+    """
+    cnts = []
+
+    def split(k, mask, c):
+        if k < 0 or not c:
+            cnts.extend([c] + [0] * ((1 << (k + 1)) - 1))
+            return
+        hi = mask & planes[k]
+        chi = popcount(hi)
+        split(k - 1, mask ^ hi, c - chi)
+        split(k - 1, hi, chi)
+
+    split(7, (1 << n) - 1, n)
+    return cnts
+
+
+def serialproducts(planes):
+    """
+    Calculate the sum of the products of successive bytes from the bit planes.
+
+    Since d[i]·d[i+1] = Σₖ Σⱼ 2ᵏ⁺ʲ·bitₖ(d[i])·bitⱼ(d[i+1]), the sum
+    is found by counting the set bits of plane k combined with plane j
+    shifted by one position.
+
+    Arguments:
+        planes: Bit planes as produced by ``bitplanes``.
+
+    Returns:
+        The sum of the products, without wrap-around.
+    """
+    shifted = [p >> 1 for p in planes]
+    return sum(
+        popcount(p & q) << (k + j)
+        for k, p in enumerate(planes)
+        for j, q in enumerate(shifted)
+    )
+
+
+@functools.cache
+def montelut():
+    """
+    Create a table that classifies Monte Carlo points by the most significant
+    bytes of their coordinates.
+
+    Returns:
+        Two lists of 256 limits, indexed by the high byte hx of x. All points
+        where the high byte of y is less than the first limit are inside the
+        circle; points where it is equal to or greater than the second limit
+        are outside. The other points have to be calculated.
+    """
+    inner, outer = [], []
+    for hx in range(256):
+        lo, hi = (hx << 16) ** 2, ((hx << 16) + 0xFFFF) ** 2
+        inner.append(min(256, max(0, (math.isqrt(INCIRC - hi) - 0xFFFF) // 65536 + 1)))
+        outer.append(min(256, (math.isqrt(INCIRC - lo) >> 16) + 1))
+    return inner, outer
+
+
+@functools.cache
+def montetables():
+    """
+    Create the translation tables for ``montecount``.
+
+    Returns:
+        Tables that translate hx to the low and high byte of
+        0x8000 + limit - 1, for the inner and outer limits from ``montelut``.
+    """
+    rv = []
+    for limits in montelut():
+        v = [0x8000 + j - 1 for j in limits]
+        rv += [bytes(j & 0xFF for j in v), bytes(j >> 8 for j in v)]
+    return rv
+
+
+def montecount(mv):
+    """
+    Count the Monte Carlo points inside the circle.
+
+    The high bytes of the coordinates of all points are gathered with slices
+    into 16-bit lanes of large integers, together with the limits from
+    ``montelut`` for every hx. A single subtraction compares all lanes; bit
+    15 of a lane stays set if hy is less than the limit. Only the points that
+    the table cannot decide (less than 1%) are calculated.
+
+    Arguments:
+        mv: bytes-like object, length a multiple of 6.
+
+    Returns:
+        Number of points inside the circle.
+    """
+    d = bytes(mv)
+    m = len(d) // MONTEN
+    hx, hy = d[0::MONTEN], d[3::MONTEN]
+    inlo, inhi, outlo, outhi = montetables()
+    lanes = bytearray(2 * m)
+    lanes[0::2] = hy
+    y = int.from_bytes(lanes, "little")
+    lanes[0::2], lanes[1::2] = hx.translate(inlo), hx.translate(inhi)
+    inner = int.from_bytes(lanes, "little")
+    lanes[0::2], lanes[1::2] = hx.translate(outlo), hx.translate(outhi)
+    outer = int.from_bytes(lanes, "little")
+    sign = int.from_bytes(b"\x00\x80" * m, "little")
+    inside = (inner - y) & sign
+    undecided = ((outer - y) & sign) ^ inside
+    inmont = popcount(inside)
+    lanes = undecided.to_bytes(2 * m, "little")
+    j = lanes.find(0x80)
+    while j >= 0:
+        k = j // 2 * MONTEN
+        x = int.from_bytes(d[k : k + 3], "big")
+        y = int.from_bytes(d[k + 3 : k + 6], "big")
+        inmont += x * x + y * y <= INCIRC
+        j = lanes.find(0x80, j + 1)
+    return inmont
+
+
+def accresult(acc, bits=False):
+    """
+    Calculate the statistics from an accumulator, one stage per statistic.
+
+    These stages only use the counts and sums gathered by the accumulator, so
+    they are not given a number of bytes.
+
+    Arguments:
+        acc: EntAccumulator with the figures for the data.
+        bits: Calculate the statistics for bits instead of bytes; this is
+            done as a single stage.
+
+    Returns:
+        The same as ``acc.result()``, or ``acc.bitresult()`` if bits is set.
+    """
+    if bits:
+        with stage("bitresult"):
+            return acc.bitresult()
+    if not acc.n:
+        raise ValueError("no data")
+    with stage("entropy"):
+        e = acc.entropy()
+    with stage("chisquare"):
+        chi2 = acc.chisquare()
+    with stage("mean"):
+        m = acc.mean()
+    with stage("montecarlo"):
+        mc = acc.montepi()
+    with stage("correlation"):
+        try:
+            scc = acc.correlation()
+        except ValueError:
+            scc = None
+    return acc.n, e, chi2, m, mc, scc
+
+
+def readchunks(name, size=CHUNKSIZE, offset=0, limit=None):
+    """
+    Read a file in chunks, re-using a single buffer.
+
+    The returned memoryviews refer to that buffer, so every chunk has to be
+    processed before the next one is requested.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input.
+        size: Maximum number of bytes per chunk.
+        offset: Position in the file to start reading from.
+        limit: Maximum number of bytes to read, or None to read to the end.
+
+    Yields:
+        memoryview of the bytes read.
+    """
+    buf = bytearray(size)
+    view = memoryview(buf)
+    with openinput(name) as inf:
+        if offset:
+            inf.seek(offset)
+        while limit is None or limit > 0:
+            with stage("read") as rec:
+                k = inf.readinto(view if limit is None else view[:limit])
+                rec["bytes"] = k
+            if not k:
+                break
+            if limit is not None:
+                limit -= k
+            yield view[:k]
+
+
+def openinput(name, buffering=-1):
+    """
+    Open a file for reading bytes.
+
+    Arguments:
+        name: Path of the file to read, or '-' for standard input. The latter
+            is not closed when the returned file is.
+        buffering: As for ``open``.
+
+    Returns:
+        A binary file object.
+    """
+    if name == "-":
+        return open(sys.stdin.fileno(), "rb", buffering, closefd=False)
+    return open(name, "rb", buffering)
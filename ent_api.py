@@ -0,0 +1,331 @@
+# file: ent_api.py
+# vim:fileencoding=utf-8:fdm=marker:ft=python
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T21:24:50+0200
+# Last modified: 2026-10-18T01:17:05+0200
+"""
+Use ‘ent’ from Python, without starting a process and parsing its output.
+
+``analyze`` returns the statistics of a file, a buffer or a binary file
+object as an ``EntResult``. The writers ``CSVWriter`` and ``NDJSONWriter``
+write such results as CSV with a single header line, or as one JSON object
+per line. They collect a number of rows before writing them, so they can be
+used for very many results.
+
+Small inputs are analysed with the pure Python ``EntAccumulator``. For large
+inputs, ``NumpyAccumulator`` from ``ent.py`` is used if numpy is available;
+only then is numpy imported.
+"""
+
+import csv
+import functools
+import json
+import math
+import os
+from ent_accumulator import CHUNKSIZE, EntAccumulator, readchunks
+from ent_without_numpy import pochisq
+
+# Below this size, EntAccumulator is done before numpy would have been
+# imported.
+SMALLINPUT = 1 << 20
+BUFFERROWS = 4096
+
+
+class EntResult:
+    """
+    Statistics of a file, buffer or stream.
+
+    The attributes are those in ``FIELDS``:
+
+        file: Name of the input, or None.
+        n: Number of bytes, or bits for a result in bits.
+        entropy: Entropy in bits per byte (or bit).
+        chisquare: Χ² value.
+        p: Probability that random data gives a larger χ² value.
+        mean: Arithmetic mean of the bytes (or bits).
+        montepi: Monte Carlo approximation of π (NaN for less than 6 bytes).
+        correlation: Serial correlation coefficient, or None if undefined.
+        width: 8 for a result in bytes, 1 for a result in bits.
+    """
+
+    FIELDS = (
+        "file",
+        "n",
+        "entropy",
+        "chisquare",
+        "p",
+        "mean",
+        "montepi",
+        "correlation",
+        "width",
+    )
+    __slots__ = FIELDS
+
+    def __init__(
+        self, file, n, entropy, chisquare, p, mean, montepi, correlation, width=8
+    ):
+        self.file = file
+        self.n = n
+        self.entropy = entropy
+        self.chisquare = chisquare
+        self.p = p
+        self.mean = mean
+        self.montepi = montepi
+        self.correlation = correlation
+        self.width = width
+
+    @classmethod
+    def fromaccumulator(cls, acc, file=None, bits=False):
+        """
+        Calculate the result from the figures gathered by an accumulator.
+
+        Arguments:
+            acc: EntAccumulator.
+            file: Name of the input.
+            bits: Calculate the statistics for bits instead of bytes.
+
+        Returns:
+            An EntResult.
+        """
+        n, e, chi2, m, mc, scc = acc.bitresult() if bits else acc.result()
+        p = pochisq(chi2, 1 if bits else 255)
+        return cls(file, n, e, chi2, p, m, mc, scc, 1 if bits else 8)
+
+    def asdict(self):
+        """Return the fields as a dictionary."""
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+    def __iter__(self):
+        return (getattr(self, k) for k in self.FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, EntResult):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        args = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.FIELDS)
+        return f"EntResult({args})"
+
+
+def analyze(source, bits=False, limit=None, name=None, size=CHUNKSIZE):
+    """
+    Calculate the statistics of a file, buffer or binary stream.
+
+    Arguments:
+        source: Path of a file (“-” for standard input), a bytes-like object,
+            or a binary file object with a ``readinto`` method.
+        bits: Calculate the statistics for bits instead of bytes.
+        limit: Maximum number of bytes to analyse, or None for all.
+        name: Name for the ``file`` field of the result. By default the path,
+            or the ``name`` of a file object.
+        size: Number of bytes to process at a time.
+
+    Returns:
+        An EntResult.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("the limit must be positive")
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        nbytes = None if path == "-" else os.path.getsize(path)
+        if limit is not None:
+            nbytes = limit if nbytes is None else min(nbytes, limit)
+        acc = accumulator(nbytes)(bits=bits)
+        for chunk in readchunks(path, size, limit=limit):
+            acc.update(chunk)
+        name = path if name is None else name
+    elif hasattr(source, "readinto"):
+        acc = accumulator(limit)(bits=bits)
+        buf = bytearray(size)
+        view = memoryview(buf)
+        while limit is None or limit > 0:
+            k = source.readinto(view if limit is None else view[: min(limit, size)])
+            if not k:
+                break
+            if limit is not None:
+                limit -= k
+            acc.update(view[:k])
+        if name is None:
+            name = getattr(source, "name", None)
+            name = name if isinstance(name, str) else None
+    else:
+        try:
+            mv = memoryview(source).cast("B")
+        except TypeError:
+            raise TypeError(
+                "source must be a path, a bytes-like object or a binary file"
+            ) from None
+        if limit is not None:
+            mv = mv[:limit]
+        acc = accumulator(len(mv))(bits=bits)
+        for start in range(0, len(mv), size):
+            acc.update(mv[start : start + size])
+    return EntResult.fromaccumulator(acc, name, bits)
+
+
+def accumulator(nbytes=None):
+    """
+    Choose the fastest accumulator for an input.
+
+    Arguments:
+        nbytes: Size of the input in bytes, or None if it is not known.
+
+    Returns:
+        The accumulator class.
+    """
+    if nbytes is not None and nbytes < SMALLINPUT:
+        return EntAccumulator
+    return _numpyaccumulator() or EntAccumulator
+
+
+@functools.cache
+def _numpyaccumulator():
+    """Return NumpyAccumulator, or None if numpy is not available."""
+    try:
+        from ent import NumpyAccumulator
+    except ImportError:
+        return None
+    return NumpyAccumulator
+
+
+class _Writer:
+    """
+    Base class for the writers. Rows are collected and written together.
+
+    Use a writer as a context manager, or call ``flush`` when done. The
+    output file is not closed by the writer.
+    """
+
+    def __init__(self, outf, rows=BUFFERROWS):
+        """
+        Create a writer.
+
+        Arguments:
+            outf: Text file to write to.
+            rows: Number of rows to collect before writing them.
+        """
+        self.outf = outf
+        self.rows = rows
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def write(self, result):
+        """
+        Write a result.
+
+        Arguments:
+            result: EntResult.
+        """
+        self.pending.append(self._format(result))
+        if len(self.pending) >= self.rows:
+            self.flush()
+
+    def writemany(self, results):
+        """
+        Write results.
+
+        Arguments:
+            results: Iterable of EntResult.
+        """
+        for result in results:
+            self.write(result)
+
+    def flush(self):
+        """Write the collected rows."""
+        if self.pending:
+            self._writerows(self.pending)
+            self.pending = []
+        self.outf.flush()
+
+    def _writerows(self, rows):
+        self.outf.write("".join(rows))
+
+
+class CSVWriter(_Writer):
+    """
+    Write results as CSV, with a single header line.
+
+    The columns are those of the batch mode of ``ent.py``, with the
+    probability of the χ² value added after it.
+    """
+
+    def __init__(self, outf, rows=BUFFERROWS, bits=False):
+        """
+        Create a CSV writer, and write the header.
+
+        Arguments:
+            outf: Text file to write to.
+            rows: Number of rows to collect before writing them.
+            bits: Name the first column “File-bits” instead of “File-bytes”.
+        """
+        super().__init__(outf, rows)
+        self.csv = csv.writer(outf, lineterminator="\n")
+        unit = "bits" if bits else "bytes"
+        self.pending.append(
+            [
+                0,
+                f"File-{unit}",
+                "Entropy",
+                "Chi-square",
+                "Chi-square-p",
+                "Mean",
+                "Monte-Carlo-Pi",
+                "Serial-Correlation",
+                "File",
+            ]
+        )
+
+    @staticmethod
+    def _format(r):
+        scc = "undefined" if r.correlation is None else f"{r.correlation:.6f}"
+        return [
+            1,
+            r.n,
+            f"{r.entropy:.6f}",
+            f"{r.chisquare:.6f}",
+            f"{r.p:.6g}",
+            f"{r.mean:.6f}",
+            f"{r.montepi:.6f}",
+            scc,
+            r.file,
+        ]
+
+    def _writerows(self, rows):
+        self.csv.writerows(rows)
+
+
+class NDJSONWriter(_Writer):
+    """
+    Write results as one JSON object per line.
+
+    The keys are those of the JSON output of the batch mode of ``ent.py``,
+    plus “width”. Numbers are written with full precision; values that are
+    not finite (like the Monte Carlo value for fewer than 6 bytes) are written
+    as null, since JSON has no NaN or Infinity.
+    """
+
+    @staticmethod
+    def _format(r):
+        return (
+            f'{{"file": {json.dumps(r.file)}, "file-bytes": {r.n}, '
+            f'"entropy": {_number(r.entropy)}, '
+            f'"chi-square": {_number(r.chisquare)}, "p": {_number(r.p)}, '
+            f'"mean": {_number(r.mean)}, "monte-carlo-pi": {_number(r.montepi)}, '
+            f'"serial-correlation": {_number(r.correlation)}, '
+            f'"width": {r.width}}}\n'
+        )
+
+
+def _number(x):
+    """Format a number as JSON, with null for None, NaN and infinity."""
+    if x is None or not math.isfinite(x):
+        return "null"
+    return repr(float(x))
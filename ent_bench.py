@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# file: ent_bench.py
+# vim:fileencoding=utf-8:fdm=marker:ft=python
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T19:40:15+0200
+# Last modified: 2026-10-18T00:41:27+0200
+"""
+Benchmarks for the different versions of ‘ent’.
+
+The ``run`` command generates deterministic inputs of several kinds and
+sizes, and times every stage of the calculation for each version. The
+results are written as JSON. The ``compare`` command reports the stages
+that became slower compared to a baseline. The ``speedup`` command compares
+ent_without_numpy.py with its per-byte predecessor and with ent.py.
+"""
+
+import argparse
+import collections
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+__version__ = "2026.10.17"
+BACKENDS = ("ent", "ent_without_numpy", "ent_decimal")
+# Name of the per-byte version of ent_without_numpy.py, see Bytewise.
+BYTEWISE = "bytewise"
+KINDS = ("random", "zero", "text")
+SIZES = "1K,64K,1M,16M"
+BLOCK = 1 << 20
+WORDS = (
+    "the of and to in is that for it as with was on be by at this from or "
+    "an have not are which but all were when we there can more if has been "
+    "entropy random byte value file data mean correlation carlo square"
+).split()
+
+
+def main(argv):
+    """
+    Run benchmarks, or compare the results of two runs.
+
+    Arguments:
+        argv: Program options.
+    """
+    opts = argparse.ArgumentParser(prog="ent_bench", description=__doc__)
+    opts.add_argument("-v", "--version", action="version", version=__version__)
+    sub = opts.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run the benchmarks")
+    run.add_argument("-o", "--output", metavar="FILE", help="write the results to FILE")
+    run.add_argument(
+        "--backends",
+        default=",".join(BACKENDS),
+        help="comma separated versions to test (default all)",
+    )
+    run.add_argument(
+        "--kinds",
+        default=",".join(KINDS),
+        help="comma separated kinds of input (default all)",
+    )
+    run.add_argument(
+        "--sizes",
+        default=SIZES,
+        help=f"comma separated input sizes, with K, M or G suffix (default {SIZES})",
+    )
+    run.add_argument(
+        "--repeat",
+        metavar="N",
+        type=int,
+        default=3,
+        help="number of runs per input; the fastest counts (default 3)",
+    )
+    run.add_argument(
+        "--workdir", metavar="DIR", help="keep the generated inputs in DIR"
+    )
+    measure = sub.add_parser("measure", help="time the stages for a single file")
+    measure.add_argument("backend", choices=BACKENDS + (BYTEWISE,))
+    measure.add_argument("file")
+    compare = sub.add_parser("compare", help="compare results to a baseline")
+    compare.add_argument("baseline", help="results of an earlier run")
+    compare.add_argument("current", help="results of the run to check")
+    compare.add_argument(
+        "--threshold",
+        metavar="F",
+        type=float,
+        default=0.1,
+        help="report slowdowns of more than a fraction F (default 0.1)",
+    )
+    compare.add_argument(
+        "--min-time",
+        metavar="S",
+        type=float,
+        default=0.001,
+        help="ignore stages that take less than S seconds (default 0.001)",
+    )
+    speedup = sub.add_parser(
+        "speedup",
+        help="compare ent_without_numpy to its per-byte version and to ent",
+    )
+    speedup.add_argument(
+        "--size", default="10M", help="size of the random input (default 10M)"
+    )
+    speedup.add_argument(
+        "--repeat",
+        metavar="N",
+        type=int,
+        default=3,
+        help="number of runs; the fastest counts (default 3)",
+    )
+    args = opts.parse_args(argv)
+    if args.command == "measure":
+        print(json.dumps(measurestages(args.backend, args.file)))
+    elif args.command == "compare":
+        with open(args.baseline) as inf:
+            baseline = json.load(inf)
+        with open(args.current) as inf:
+            current = json.load(inf)
+        slower = compareruns(baseline, current, args.threshold, args.min_time)
+        for backend, kind, size, stage, old, new in slower:
+            print(
+                f"{backend} {kind} {size} {stage}: {old:.6f} s → {new:.6f} s "
+                f"({100 * (new / old - 1):+.0f}%)"
+            )
+        return 1 if slower else 0
+    elif args.command == "speedup":
+        if args.repeat < 1:
+            opts.error("the number of runs must be positive")
+        try:
+            size = parsesize(args.size)
+        except ValueError:
+            opts.error(f"invalid size “{args.size}”")
+        backends = [BYTEWISE, "ent_without_numpy", "ent"]
+        with tempfile.TemporaryDirectory() as tmp:
+            results = runall(backends, ["random"], [size], args.repeat, tmp)
+        times = totals(results)
+        for backend in backends:
+            print(f"{backend:<20} {times[backend]:8.3f} s")
+        before, after = times[BYTEWISE], times["ent_without_numpy"]
+        print(f"ent_without_numpy is {before / after:.1f}× as fast as before,")
+        print(f"and takes {after / times['ent']:.1f}× as long as ent.")
+    else:
+        if args.repeat < 1:
+            opts.error("the number of runs must be positive")
+        try:
+            sizes = [parsesize(s) for s in args.sizes.split(",")]
+        except ValueError:
+            opts.error(f"invalid sizes “{args.sizes}”")
+        backends = args.backends.split(",")
+        kinds = args.kinds.split(",")
+        if not set(backends) <= {*BACKENDS, BYTEWISE} or not set(kinds) <= set(KINDS):
+            opts.error("unknown version or kind of input")
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = args.workdir or tmp
+            results = runall(backends, kinds, sizes, args.repeat, workdir)
+        if args.output:
+            with open(args.output, "w") as outf:
+                json.dump(results, outf, indent=1)
+        else:
+            print(json.dumps(results, indent=1))
+
+
+def parsesize(text):
+    """
+    Convert a size like “64K” or “2G” to a number of bytes.
+
+    Arguments:
+        text: Number, optionally followed by K, M or G (powers of 1024).
+
+    Returns:
+        The size in bytes.
+    """
+    text = text.strip().upper()
+    shift = {"K": 10, "M": 20, "G": 30}.get(text[-1:], 0)
+    if shift:
+        text = text[:-1]
+    size = int(text) << shift
+    if size < 1:
+        raise ValueError("size must be positive")
+    return size
+
+
+def makeinput(path, kind, size, seed=20261017):
+    """
+    Write a deterministic input file, one block at a time.
+
+    Arguments:
+        path: Path of the file to write.
+        kind: “random”, “zero” or “text”.
+        size: Size of the file in bytes.
+        seed: Seed for the random generator.
+    """
+    rnd = random.Random(seed)
+    if kind == "text":
+        text = " ".join(rnd.choice(WORDS) for _ in range(BLOCK // 4)).encode()
+        text = text[:BLOCK]
+    with open(path, "wb") as outf:
+        for start in range(0, size, BLOCK):
+            k = min(BLOCK, size - start)
+            if kind == "random":
+                outf.write(rnd.randbytes(k))
+            elif kind == "zero":
+                outf.write(bytes(k))
+            else:
+                outf.write(text[:k])
+
+
+def measurestages(backend, name):
+    """
+    Time the stages of the calculation for one version and file.
+
+    Every stage is timed separately, and the peak of the memory allocated in
+    that stage is traced with tracemalloc. This should run in a fresh
+    process, so that the peak resident set size belongs to this file.
+
+    Arguments:
+        backend: Name of the module to test.
+        name: Path of the file to analyse.
+
+    Returns:
+        A dictionary with the size of the file, the peak resident set size in
+        bytes (or None if unknown), and per stage the time in seconds and the
+        peak traced memory in bytes.
+    """
+    mod = Bytewise if backend == BYTEWISE else importlib.import_module(backend)
+    if backend == "ent_decimal":
+        stages = (
+            ("readdata", lambda _: mod.readdata(name)),
+            ("entropy", lambda r: mod.entropy(r["readdata"].counts)),
+            ("pearsonchisquare", lambda r: mod.pearsonchisquare(r["readdata"].counts)),
+            ("pochisq", lambda r: mod.pochisq(r["pearsonchisquare"])),
+            ("correlation", lambda r: mod.correlation(r["readdata"])),
+            ("monte_carlo", lambda r: mod.monte_carlo(r["readdata"])),
+        )
+    else:
+        stages = (
+            ("readdata", lambda _: mod.readdata(name)),
+            ("entropy", lambda r: mod.entropy(r["readdata"][1])),
+            ("pearsonchisquare", lambda r: mod.pearsonchisquare(r["readdata"][1])),
+            ("pochisq", lambda r: mod.pochisq(r["pearsonchisquare"])),
+            ("correlation", lambda r: mod.correlation(r["readdata"][0])),
+            ("monte_carlo", lambda r: mod.monte_carlo(r["readdata"][0])),
+        )
+    # Tracing allocations slows down the stages, so they are timed in a
+    # first pass and traced in a second.
+    rv = {"size": os.path.getsize(name), "stages": {}}
+    for trace in (False, True):
+        results = {}
+        for stage, func in stages:
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                results[stage] = func(results)
+            except ValueError:
+                results[stage] = None
+            seconds = time.perf_counter() - start
+            if trace:
+                rv["stages"][stage]["peak"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                rv["stages"][stage] = {"seconds": seconds}
+    rv["rss"] = peakrss()
+    return rv
+
+
+def peakrss():
+    """Return the peak resident set size of this process in bytes, or None."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def runall(backends, kinds, sizes, repeat, workdir):
+    """
+    Run the benchmarks for all combinations of version, kind and size.
+
+    Every measurement runs in a separate process.
+
+    Arguments:
+        backends: Names of the modules to test.
+        kinds: Kinds of input.
+        sizes: Sizes of input in bytes.
+        repeat: Number of runs per input; the fastest time of every stage and
+            the lowest memory use are kept.
+        workdir: Directory for the generated inputs.
+
+    Returns:
+        A dictionary with a description of the system and a list of results.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    rv = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.platform(),
+        "results": [],
+    }
+    for kind in kinds:
+        for size in sizes:
+            path = os.path.join(workdir, f"{kind}-{size}.dat")
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                makeinput(path, kind, size)
+            for backend in backends:
+                runs = []
+                for _ in range(repeat):
+                    out = subprocess.run(
+                        [sys.executable, __file__, "measure", backend, path],
+                        cwd=here,
+                        capture_output=True,
+                        check=True,
+                        text=True,
+                    )
+                    runs.append(json.loads(out.stdout))
+                rec = {"backend": backend, "kind": kind, "size": size}
+                rss = [r["rss"] for r in runs if r["rss"] is not None]
+                rec["rss"] = min(rss) if rss else None
+                rec["stages"] = {}
+                for stage in runs[0]["stages"]:
+                    seconds = min(r["stages"][stage]["seconds"] for r in runs)
+                    rec["stages"][stage] = {
+                        "seconds": seconds,
+                        "mbps": size / seconds / 1e6 if seconds else None,
+                        "peak": min(r["stages"][stage]["peak"] for r in runs),
+                    }
+                rv["results"].append(rec)
+                print(
+                    f"{backend} {kind} {size}: "
+                    f"{sum(s['seconds'] for s in rec['stages'].values()):.4f} s",
+                    file=sys.stderr,
+                )
+    return rv
+
+
+def totals(results):
+    """
+    Add up the times of the stages per version.
+
+    Arguments:
+        results: Results of a run with a single input, as produced by runall.
+
+    Returns:
+        A dictionary of the total time in seconds per version.
+    """
+    return {
+        r["backend"]: math.fsum(s["seconds"] for s in r["stages"].values())
+        for r in results["results"]
+    }
+
+
+class Bytewise:
+    """
+    The stages of ent_without_numpy.py as they were before the bit-plane
+    kernels, with loops over the individual bytes. This is the baseline for
+    the ``speedup`` command.
+    """
+
+    @staticmethod
+    def readdata(name):
+        with open(name, "rb") as inf:
+            data = inf.read()
+        return data, collections.Counter(data).values()
+
+    @staticmethod
+    def entropy(counts):
+        sz = sum(counts)
+        p = [n / sz for n in counts]
+        c = math.log(256)
+        return -sum(n * math.log(n) / c for n in p) * 8
+
+    @staticmethod
+    def pearsonchisquare(counts):
+        np = sum(counts) / 256
+        return sum((c - np) ** 2 / np for c in counts)
+
+    @staticmethod
+    def pochisq(x, df=255):
+        from ent_without_numpy import pochisq
+
+        return pochisq(x, df)
+
+    @staticmethod
+    def correlation(d):
+        totalc = len(d)
+        b = d[1:] + d[:1]
+        scct1 = sum(i * j for i, j in zip(d, b))
+        scct2 = sum(d) ** 2
+        scct3 = sum(j * j for j in d)
+        scc = totalc * scct3 - scct2
+        if scc == 0:
+            raise ValueError
+        return (totalc * scct1 - scct2) / scc
+
+    @staticmethod
+    def monte_carlo(d):
+        d = d[: len(d) // 6 * 6]
+        values = [
+            a * 65536.0 + b * 256.0 + c * 1.0
+            for a, b, c in zip(d[0::3], d[1::3], d[2::3])
+        ]
+        montex = values[0::2]
+        montey = values[1::2]
+        dist2 = (i * i + j * j for i, j in zip(montex, montey))
+        # constant in the next line is (256.0 ** 3 - 1) ** 2
+        inmont = sum(k <= 281474943156225.0 for k in dist2)
+        return 4 * inmont / len(montex)
+
+
+def compareruns(baseline, current, threshold=0.1, mintime=0.001):
+    """
+    Find the stages that have become slower.
+
+    Arguments:
+        baseline: Results of the earlier run, as produced by runall.
+        current: Results of the run to check.
+        threshold: Fraction by which a stage has to be slower to be reported.
+        mintime: Stages that take less than this many seconds in both runs
+            are ignored, because their times are mostly noise.
+
+    Returns:
+        List of (backend, kind, size, stage, old, new) tuples, where old and
+        new are the times in seconds.
+    """
+    old = {
+        (r["backend"], r["kind"], r["size"], stage): s["seconds"]
+        for r in baseline["results"]
+        for stage, s in r["stages"].items()
+    }
+    rv = []
+    for r in current["results"]:
+        for stage, s in r["stages"].items():
+            key = (r["backend"], r["kind"], r["size"], stage)
+            if key not in old or max(old[key], s["seconds"]) < mintime:
+                continue
+            if s["seconds"] > old[key] * (1 + threshold):
+                rv.append(key + (old[key], s["seconds"]))
+    return rv
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,136 @@
+# file: ent_cache.py
+# vim:fileencoding=utf-8:fdm=marker:ft=python
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T17:05:40+0200
+# Last modified: 2026-10-17T17:05:40+0200
+"""
+On-disk cache of the accumulated figures for files.
+
+The cache is an SQLite database. A file is identified by its path together
+with its size, modification time, device and inode, or optionally by the
+SHA-256 hash of its contents. What is stored is the state of an
+EntAccumulator, so all statistics (including those of ``-b`` and ``-c``) can
+be derived from it. The least recently used entries are removed when there
+are more than a given number of them.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+MAXENTRIES = 1 << 16
+HASHBLOCK = 1 << 20
+
+
+class ResultCache:
+    """
+    Cache of EntAccumulator states, keyed by file identity.
+
+    Use it as a context manager; the eviction of old entries happens when it
+    is closed. Several processes can use the same cache at the same time.
+    """
+
+    def __init__(self, path, maxentries=MAXENTRIES, usehash=False, refresh=False):
+        """
+        Open (or create) a cache.
+
+        Arguments:
+            path: Path of the database file.
+            maxentries: Maximum number of entries to keep.
+            usehash: Identify files by the hash of their contents.
+            refresh: Ignore the stored entries; new results still replace
+                them.
+        """
+        self.maxentries = maxentries
+        self.usehash = usehash
+        self.refresh = refresh
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, ident TEXT, state TEXT, used REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS byuse ON results (used)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def key(self, name):
+        """
+        Determine the identity of a file.
+
+        Do this before reading the file, so that changes made while it is
+        being read invalidate the entry.
+
+        Arguments:
+            name: Path of the file.
+
+        Returns:
+            A (key, ident) tuple of strings.
+        """
+        if self.usehash:
+            h = hashlib.sha256()
+            with open(name, "rb") as inf:
+                for block in iter(lambda: inf.read(HASHBLOCK), b""):
+                    h.update(block)
+            return "sha256:" + h.hexdigest(), ""
+        st = os.stat(name)
+        ident = f"{st.st_size}:{st.st_mtime_ns}:{st.st_dev}:{st.st_ino}"
+        return os.path.realpath(name), ident
+
+    def get(self, key):
+        """
+        Look up the state stored for a file, and mark it as used.
+
+        Arguments:
+            key: Identity of the file as returned by ``key``.
+
+        Returns:
+            The stored state as a dictionary, or None if the file is not in
+            the cache or has changed.
+        """
+        if self.refresh:
+            return None
+        row = self.db.execute(
+            "SELECT state FROM results WHERE key = ? AND ident = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        with self.db:
+            self.db.execute(
+                "UPDATE results SET used = ? WHERE key = ?", (time.time(), key[0])
+            )
+        return json.loads(row[0])
+
+    def put(self, key, state):
+        """
+        Store the state for a file.
+
+        Arguments:
+            key: Identity of the file as returned by ``key``.
+            state: Dictionary as returned by EntAccumulator.state.
+        """
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (*key, json.dumps(state), time.time()),
+            )
+
+    def close(self):
+        """Remove the least recently used entries, and close the cache."""
+        with self.db:
+            self.db.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.maxentries,),
+            )
+        self.db.close()
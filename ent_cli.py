@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# file: ent_cli.py
+# vim:fileencoding=utf-8:fdm=marker:ft=python
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T20:52:30+0200
+# Last modified: 2026-10-18T01:40:22+0200
+"""
+Single entry point for the versions of the ‘ent’ program.
+
+Unless a version is chosen with ``--backend``, the version without numpy is
+used when the files are small and only its options are used, because then
+importing numpy takes longer than the analysis itself. Otherwise ‘ent.py’ is
+used, which also uses the compiled kernel if that is available. The chosen
+version is only imported when it is needed. ``--version`` reports the version
+of the chosen program.
+"""
+
+import os
+import sys
+
+BACKENDS = {"numpy": "ent", "python": "ent_without_numpy", "decimal": "ent_decimal"}
+# Below this total input size, the pure Python version is done before numpy
+# would have been imported.
+SMALLINPUT = 1 << 20
+# Options that ent_without_numpy.py also has.
+PYTHONOPTIONS = {"-b", "-c", "-s", "--chunksize", "--limit", "-t", "--profile"}
+PYTHONOPTIONS |= {"--profile-json", "-h", "--help", "-v", "--version"}
+
+
+def main(argv):
+    """
+    Choose a version of ‘ent’ and run it.
+
+    Arguments:
+        argv: Program options. These are passed on to the chosen version,
+            except for ``--backend NAME`` or ``--backend=NAME``.
+
+    Returns:
+        The return value of the main function of the chosen version.
+    """
+    argv = list(argv)
+    backend = "auto"
+    for k, a in enumerate(argv):
+        if a == "--backend":
+            backend = argv[k + 1] if k + 1 < len(argv) else None
+            del argv[k : k + 2]
+            break
+        if a.startswith("--backend="):
+            backend = a.partition("=")[2]
+            del argv[k]
+            break
+    if backend not in ("auto", *BACKENDS):
+        print(
+            f"ent: --backend must be one of: auto, {', '.join(BACKENDS)}",
+            file=sys.stderr,
+        )
+        return 2
+    if backend == "auto":
+        backend = choose(argv)
+    if "-h" in argv or "--help" in argv:
+        choices = ",".join(("auto", *BACKENDS))
+        print(f"ent: version “{backend}”; choose one with", end=" ")
+        print(f"--backend {{{choices}}}.\n")
+    # Unlike importlib.import_module, this shows up in “-X importtime”.
+    return __import__(BACKENDS[backend]).main(argv)
+
+
+def choose(argv):
+    """
+    Choose the fastest version of ‘ent’ for the given options.
+
+    Arguments:
+        argv: Program options.
+
+    Returns:
+        “python” or “numpy”.
+    """
+    from importlib.util import find_spec
+
+    if find_spec("numpy") is None:
+        return "python"
+    names = [a for a in argv if not a.startswith("-")]
+    options = {a.split("=")[0] for a in argv if a.startswith("-") and a != "-"}
+    if not options <= PYTHONOPTIONS or "-" in argv:
+        return "numpy"
+    try:
+        total = sum(os.path.getsize(a) for a in names if os.path.isfile(a))
+    except OSError:
+        return "numpy"
+    return "python" if total < SMALLINPUT else "numpy"
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -5,25 +5,27 @@
 # Copyright © 2018 R.F. Smith <rsmith@xs4all.nl>.
 # SPDX-License-Identifier: MIT
 # Created: 2012-08-25T23:37:50+0200
-# Last modified: 2021-05-29T00:12:18+0200
+# Last modified: 2026-10-18T01:31:55+0200
 """
 Partial implementation of the ‘ent’ program by John "Random" Walker in Python.
 
-This version uses Decimal where possible.
+This version uses Decimal numbers for the results. The sums that they are
+derived from are exact integers, gathered by an EntAccumulator.
 
 See http://www.fourmilab.ch/random/ for the original.
 """
 
-from decimal import Decimal
 import argparse
-import collections
-import itertools as it
+import decimal
 import math
-import statistics as stat
 import sys
+from decimal import Decimal
+from ent_accumulator import CHUNKSIZE, EntAccumulator, readchunks
+from ent_output import countout
+from ent_profile import Profiler, jsonout, profileout
 
 __version__ = "2021.05.29"
-PI = Decimal("3.14159265358979323846")
+PI = Decimal("3.14159265358979323846264338327950288419716939937510")
 
 
 def main(argv):
@@ -34,40 +36,89 @@ def main(argv):
         argv: Program options.
     """
     opts = argparse.ArgumentParser(prog="ent", description=__doc__)
+    opts.add_argument("-c", action="store_true", help="print occurrence counts")
     opts.add_argument(
-        "-c", action="store_true", help="print occurrence counts (not implemented yet)"
+        "-p",
+        "--precision",
+        metavar="N",
+        type=int,
+        default=28,
+        help="number of significant digits for the calculations (default 28)",
     )
     opts.add_argument("-t", action="store_true", help="terse output in CSV format")
+    opts.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time and memory used by every stage",
+    )
+    opts.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="append the profile to FILE as JSON lines instead",
+    )
     opts.add_argument("-v", "--version", action="version", version=__version__)
     opts.add_argument(
         "files", metavar="file", nargs="*", help="one or more files to process"
     )
     args = opts.parse_args(argv)
-    for fname in args.files:
-        data, cnts = readdata(fname)
-        e = entropy(cnts)
-        c = pearsonchisquare(cnts)
-        p = pochisq(c)
-        # p = 0
-        d = math.fabs(p * 100 - 50)
-        m = monte_carlo(data)
-        try:
-            scc = correlation(data)
-            es = f"{scc:.6f}"
-        except ValueError:
-            es = "undefined"
-        if args.t:
-            terseout(data, e, c, p, d, es, m)
-        else:
-            textout(data, e, c, p, d, es, m)
-
-
-def terseout(data, e, chi2, p, d, scc, mc):
+    if args.precision < 1:
+        opts.error("precision must be positive")
+    decimal.getcontext().prec = args.precision
+    profiling = args.profile or args.profile_json is not None
+    status = 0
+    with Profiler(profiling) as prof:
+        for fname in args.files:
+            prof.file = fname
+            try:
+                with prof.stage("readdata") as rec:
+                    acc = readdata(fname)
+                    n = rec["bytes"] = acc.n
+            except OSError as err:
+                print(f"ent: {fname}: {err}", file=sys.stderr)
+                status = 1
+                continue
+            if not n:
+                print(f"ent: {fname}: no data", file=sys.stderr)
+                prof.take()
+                status = 1
+                continue
+            if args.c:
+                countout(acc.counts, args.t)
+            with prof.stage("entropy"):
+                e = entropy(acc.counts)
+            with prof.stage("chisquare"):
+                c = pearsonchisquare(acc.counts)
+            with prof.stage("pochisq"):
+                p = pochisq(c)
+            d = math.fabs(p * 100 - 50)
+            with prof.stage("mean"):
+                m = mean(acc.counts)
+            with prof.stage("montecarlo"):
+                mc = monte_carlo(acc)
+            with prof.stage("correlation"):
+                try:
+                    scc = correlation(acc)
+                    es = f"{scc:.6f}"
+                except ValueError:
+                    es = "undefined"
+            if args.t:
+                terseout(n, m, e, c, p, d, es, mc)
+            else:
+                textout(n, m, e, c, p, d, es, mc)
+            if args.profile_json is not None:
+                jsonout(prof.take(), args.profile_json)
+            elif args.profile:
+                profileout(prof.take(), args.t)
+    return status
+
+
+def terseout(n, m, e, chi2, p, d, scc, mc):
     """
     Print the results in terse CSV.
 
     Arguments:
-        data: file contents
+        n: Number of bytes in the file.
+        m: Arithmetic mean of the data.
         e: Entropy of the data in bits per byte.
         chi2: Χ² value for the data.
         p: Probability of normal z value.
@@ -76,17 +127,16 @@ def terseout(data, e, chi2, p, d, scc, mc):
         mc: Monte Carlo approximation of π.
     """
     print("0,File-bytes,Entropy,Chi-square,Mean," "Monte-Carlo-Pi,Serial-Correlation")
-    n = len(data)
-    m = sum(Decimal(j) for j in data) / n
     print(f"1,{n},{e},{chi2},{m},{mc},{scc}")
 
 
-def textout(data, e, chi2, p, d, scc, mc):
+def textout(n, m, e, chi2, p, d, scc, mc):
     """
     Print the results in plain text.
 
     Arguments:
-        data: file contents
+        n: Number of bytes in the file.
+        m: Arithmetic mean of the data.
         e: Entropy of the data in bits per byte.
         chi2: Χ² value for the data.
         p: Probability of normal z value.
@@ -97,7 +147,6 @@ def textout(data, e, chi2, p, d, scc, mc):
     print(f"- Entropy is {e} bits per byte.")
     print("- Optimum compression would reduce the size")
     red = (100 * (8 - e)) / 8
-    n = len(data)
     print(f"  of this {n} byte file by {red:.0f}%.")
     print(f"- χ² distribution for {n} samples is {chi2}, and randomly")
     pp = 100 * p
@@ -111,28 +160,30 @@ def textout(data, e, chi2, p, d, scc, mc):
         print("is close to random, but not perfect.")
     else:
         print("looks random.")
-    m = sum(Decimal(j) for j in data) / len(data)
     print(f"- Arithmetic mean value of data bytes is {m} (random = 127.5).")
     err = 100 * ((PI - mc).copy_abs() / PI)
     print(f"- Monte Carlo value for π is {mc} (error {err:.2f}%).")
     print(f"- Serial correlation coefficient is {scc} (totally uncorrelated = 0.0).")
 
 
-def readdata(name):
+def readdata(name, size=CHUNKSIZE):
     """
-    Read the data from a file and count byte occurences.
+    Read the data from a file and accumulate the figures for the statistics.
+
+    These are exact integers; they are only converted to Decimal for the
+    final calculations.
 
     Arguments:
         name: Path of the file to read
+        size: Number of bytes to read at a time.
 
     Returns:
-        data: list containing the byte values.
-        cnts: list containing the occurance of each byte as Decimal.
+        An EntAccumulator for the contents of the file.
     """
-    with open(name, "rb") as inf:
-        data = inf.read()
-    cnts = [Decimal(c) for c in collections.Counter(data).values()]
-    return data, cnts
+    acc = EntAccumulator()
+    for chunk in readchunks(name, size):
+        acc.update(chunk)
+    return acc
 
 
 def entropy(counts):
@@ -140,16 +191,31 @@ def entropy(counts):
     Calculate the entropy of the data represented by the counts array.
 
     Arguments:
-        counts: list of Decimal
+        counts: list containing the occurance of each byte value 0−255.
 
     Returns:
         Entropy in bits per byte as a Decimal.
     """
-    sz = sum(counts)
-    p = [n / sz for n in counts]
-    c = Decimal.ln(Decimal(256))
-    ent = -sum(n * Decimal.ln(n) / c for n in p)
-    return ent * 8
+    sz = Decimal(sum(counts))
+    p = [Decimal(n) / sz for n in counts if n]
+    c = Decimal(256).ln()
+    ent = -sum(n * n.ln() for n in p) / c
+    # For a single byte value the entropy is zero, but with the exponent of
+    # the division; it would be printed as 0E+27.
+    return ent * 8 if ent else Decimal(0)
+
+
+def mean(counts):
+    """
+    Calculate the arithmetic mean of the data represented by the counts array.
+
+    Arguments:
+        counts: list containing the occurance of each byte value 0−255.
+
+    Returns:
+        The mean value of the bytes as a Decimal.
+    """
+    return Decimal(sum(k * n for k, n in enumerate(counts))) / sum(counts)
 
 
 def pearsonchisquare(counts):
@@ -159,37 +225,39 @@ def pearsonchisquare(counts):
     See [http://en.wikipedia.org/wiki/Pearson%27s_chi-squared_test
     #Discrete_uniform_distribution]
 
+    With N samples, Σ(c − N/256)²/(N/256) equals (256·Σc² − N²)/N. The
+    numerator is calculated with integers.
+
     Arguments:
-        counts: list of Decimal
+        counts: list containing the occurance of each byte value 0−255.
 
     Returns:
         χ² value as a Decimal.
     """
-    np = sum(counts) / Decimal(256)
-    return sum((c - np) ** 2 / np for c in counts)
+    sz = sum(counts)
+    return Decimal(256 * sum(c * c for c in counts) - sz * sz) / sz
 
 
-def correlation(d):
+def correlation(acc):
     """
     Calculate the serial correlation coefficient of the data.
 
     Arguments:
-        d: bytes
+        acc: EntAccumulator for the data.
 
     Returns:
         Serial correlation coeffiecient as a Decimal.
     """
-    totalc = Decimal(len(d))
-    a = [Decimal(j) for j in d]
-    b = a[1:] + [a[0]]
-    scct1 = sum(i * j for i, j in zip(d, b))
-    scct2 = sum(d) ** 2
-    scct3 = sum(j * j for j in d)
+    totalc = acc.n
+    if totalc == 0:
+        raise ValueError
+    scct1 = acc.scct1 + acc.last * acc.first
+    scct2 = sum(k * n for k, n in enumerate(acc.counts)) ** 2
+    scct3 = sum(k * k * n for k, n in enumerate(acc.counts))
     scc = totalc * scct3 - scct2
-    if scc == Decimal(0):
+    if scc == 0:
         raise ValueError
-    scc = (totalc * scct1 - scct2) / scc
-    return scc
+    return Decimal(totalc * scct1 - scct2) / scc
 
 
 def pochisq(x, df=255):
@@ -221,17 +289,17 @@ def pochisq(x, df=255):
     if not isinstance(df, int):
         raise ValueError("df must be an integer")
     if x <= 0.0 or df < 1:
-        return 1.0
+        return Decimal(1)
     # Constants
-    LOG_SQRT_PI = Decimal("0.5723649429247000870717135")  # log(√π)
-    I_SQRT_PI = Decimal("0.5641895835477562869480795")  # 1/√π
+    LOG_SQRT_PI = pi().ln() / 2  # log(√π)
+    I_SQRT_PI = 1 / pi().sqrt()  # 1/√π
     BIGX = Decimal(20)
     a = Decimal(0.5) * x
     even = df % 2 == 0
     if df > 1:
-        y = -a.exp()
-    nd = stat.NormalDist()
-    s = y if even else Decimal(2) * Decimal(nd.cdf(float(-x.sqrt())))
+        y = (-a).exp()
+    # 2·Φ(−√x) = erfc(√(x/2))
+    s = y if even else erfc(a.sqrt())
     if df > 2:
         x = 0.5 * (df - 1.0)
         z = Decimal(1) if even else Decimal(0.5)
@@ -255,32 +323,94 @@ def pochisq(x, df=255):
         return s
 
 
-def monte_carlo(d):
+def erfc(x):
+    """
+    Calculate the complementary error function with the precision of the
+    current context.
+
+    For x² ≤ 20 the series
+    erf(x) = 2/√π·exp(−x²)·Σ x·(2x²)ⁿ/(1·3·…·(2n+1))
+    is used, with enough extra digits to make up for the cancellation in
+    1 − erf(x). Otherwise the continued fraction
+    erfc(x) = exp(−x²)/√π·1/(x + ½/(x + 1/(x + 1½/(x + …))))
+    is evaluated with the modified Lentz method.
+
+    Arguments:
+        x: Decimal, not negative.
+
+    Returns:
+        erfc(x) as a Decimal.
+    """
+    prec = decimal.getcontext().prec
+    with decimal.localcontext() as ctx:
+        if x * x <= 20:
+            # 1 − erf(x) loses about x²/ln(10) digits.
+            ctx.prec = prec + 10 + int(x * x) // 2
+            xx = x * x
+            term = total = x
+            n = 0
+            while True:
+                n += 1
+                term = term * 2 * xx / (2 * n + 1)
+                if total + term == total:
+                    break
+                total += term
+            rv = 1 - 2 / pi().sqrt() * (-xx).exp() * total
+        else:
+            ctx.prec = prec + 10
+            eps = Decimal(10) ** (2 - ctx.prec)
+            f = c = x
+            d = Decimal(0)
+            k = 0
+            while True:
+                k += 1
+                a = Decimal(k) / 2
+                d = 1 / (x + a * d)
+                c = x + a / c
+                delta = c * d
+                f *= delta
+                if abs(delta - 1) < eps:
+                    break
+            rv = (-x * x).exp() / (pi().sqrt() * f)
+    return +rv
+
+
+def pi():
+    """
+    Calculate π with the precision of the current context.
+
+    This is the recipe from the documentation of the decimal module.
+
+    Returns:
+        π as a Decimal.
+    """
+    with decimal.localcontext() as ctx:
+        ctx.prec += 2
+        three = Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    return +s
+
+
+def monte_carlo(acc):
     """
     Calculate Monte Carlo value for π.
 
     Arguments:
-        d: list of unsigned byte values.
+        acc: EntAccumulator for the data.
 
     Returns:
-        Approximation of π as Decimal
+        Approximation of π as Decimal, NaN if there are less than six bytes.
     """
-    MONTEN = 6
-    incirc = Decimal((256.0 ** (MONTEN // 2) - 1) ** 2)
-    d = (Decimal(j) for j in d[: len(d) // MONTEN * MONTEN])
-    intermediate = (
-        i * j
-        for i, j in zip(d, it.cycle([Decimal(256 ** 2), Decimal(256), Decimal(1)]))
-    )
-    args = [intermediate] * 3
-    values = [sum(j) for j in it.zip_longest(*args)]
-    montex = values[0::2]
-    montey = values[1::2]
-    dist2 = (i * i + j * j for i, j in zip(montex, montey))
-    inmont = Decimal(sum(j <= incirc for j in dist2))
-    montepi = 4 * inmont / len(montex)
-    return montepi
+    if acc.montec == 0:
+        return Decimal("NaN")
+    return Decimal(4 * acc.inmont) / acc.montec
 
 
 if __name__ == "__main__":
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))
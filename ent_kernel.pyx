@@ -0,0 +1,59 @@
+# file: ent_kernel.pyx
+# vim:fileencoding=utf-8:fdm=marker:ft=cython
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T12:02:40+0200
+# Last modified: 2026-10-17T15:21:44+0200
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional compiled kernel for ent.py.
+
+It calculates the byte histogram, the sum of the products of successive
+bytes, the pairs of successive 1 bits between bytes and the Monte Carlo count
+in a single pass over the data. Build it
+with “make kernel”. If it is not available, ent.py uses numpy instead.
+"""
+
+
+def scan(const unsigned char[::1] d, unsigned long long[::1] counts,
+         Py_ssize_t start, Py_ssize_t end):
+    """
+    Process a buffer in one pass.
+
+    Arguments:
+        d: Buffer of bytes.
+        counts: Buffer of 256 unsigned 64-bit integers; the byte counts are
+            added to it.
+        start, end: Range of complete six-byte Monte Carlo groups in d.
+
+    Returns:
+        The sum of the products of successive bytes, the number of bytes with
+        bit 0 set followed by a byte with bit 7 set, and the number of Monte
+        Carlo points inside the circle.
+    """
+    cdef Py_ssize_t i, k = start
+    cdef Py_ssize_t n = d.shape[0]
+    cdef unsigned long long prod = 0, pairs = 0, inmont = 0, x, y
+    cdef unsigned long long incirc = 281474943156225ULL  # (256**3 - 1)**2
+    cdef unsigned int c, prev
+    if counts.shape[0] != 256:
+        raise ValueError("counts must have 256 elements")
+    if not 0 <= start <= end <= n or (end - start) % 6:
+        raise ValueError("invalid Monte Carlo range")
+    if n == 0:
+        return 0, 0, 0
+    prev = d[0]
+    counts[prev] += 1
+    for i in range(1, n):
+        c = d[i]
+        counts[c] += 1
+        prod += prev * c
+        pairs += prev & (c >> 7)
+        prev = c
+        if i == k + 5 and i < end:
+            x = (<unsigned long long>d[k] << 16) | (d[k + 1] << 8) | d[k + 2]
+            y = (<unsigned long long>d[k + 3] << 16) | (d[k + 4] << 8) | c
+            inmont += x * x + y * y <= incirc
+            k += 6
+    return prod, pairs, inmont
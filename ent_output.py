@@ -0,0 +1,102 @@
+# file: ent_output.py
+# vim:fileencoding=utf-8:fdm=marker:ft=python
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T23:52:40+0200
+# Last modified: 2026-10-18T01:11:40+0200
+"""
+Output of the results, shared by ent.py and ent_without_numpy.py.
+
+This module only uses the standard library.
+"""
+
+import math
+
+PI = 3.14159265358979323846
+
+
+def countout(counts, terse=False):
+    """
+    Print the occurrence counts in the format of the original ``ent -c``.
+
+    Arguments:
+        counts: Sequence of the occurrences of each value (bytes or bits).
+        terse: Print CSV instead of a table.
+    """
+    total = sum(counts)
+    if terse:
+        print("2,Value,Occurrences,Fraction")
+        for j, c in enumerate(counts):
+            print(f"3,{j},{c},{c / total:.6f}")
+        return
+    print("Value Char Occurrences Fraction")
+    for j, c in enumerate(counts):
+        if c:
+            ch = chr(j) if 32 < j < 127 or 160 < j < 256 else " "
+            print(f"{j:3d}   {ch}   {c:10d}   {c / total:.6f}")
+    print(f"\nTotal:    {total:10d}   {1:.6f}\n")
+
+
+def terseout(n, m, e, chi2, p, d, scc, mc, width=8):
+    """
+    Print the results in terse CSV.
+
+    Arguments:
+        n: Number of bytes (or symbols) in the file.
+        m: Arithmetic mean of the data.
+        e: Entropy of the data in bits per byte (or symbol).
+        chi2: Χ² value for the data.
+        p: Probability of normal z value.
+        d: Percent distance of p from centre.
+        scc: Serial correlation coefficient.
+        mc: Monte Carlo approximation of π.
+        width: Size of the symbols in bits.
+    """
+    unit = {1: "bits", 8: "bytes"}.get(width, "symbols")
+    print(f"0,File-{unit},Entropy,Chi-square,Mean,Monte-Carlo-Pi,Serial-Correlation")
+    print(f"1,{n},{e:.6f},{chi2:.6f},{m:.6f},{mc:.6f},{scc}")
+
+
+def textout(n, m, e, chi2, p, d, scc, mc, width=8):
+    """
+    Print the results in plain text.
+
+    Arguments:
+        n: Number of bytes (or symbols) in the file.
+        m: Arithmetic mean of the data.
+        e: Entropy of the data in bits per byte (or symbol).
+        chi2: Χ² value for the data.
+        p: Probability of normal z value, or None if there are too few
+            symbols for the χ² test.
+        d: Percent distance of p from centre.
+        scc: Serial correlation coefficient.
+        mc: Monte Carlo approximation of π.
+        width: Size of the symbols in bits.
+    """
+    unit = {1: "bit", 8: "byte"}.get(width, f"{width}-bit symbol")
+    mid = ((1 << width) - 1) / 2
+    print(f"- Entropy is {e:.6f} bits per {unit}.")
+    print("- Optimum compression would reduce the size")
+    red = (100 * (width - e)) / width
+    print(f"  of this {n} {unit} file by {red:.0f}%.")
+    if p is None:
+        print(f"- χ² distribution for {n} samples is {chi2:.2f}. With fewer than 5")
+        print("  samples expected per value, the χ² test is unreliable.")
+    else:
+        print(f"- χ² distribution for {n} samples is {chi2:.2f}, and randomly")
+        pp = 100 * p
+        print(f"  would exceed this value {pp:.2f}% of the times.")
+        print("  According to the χ² test, this sequence", end=" ")
+        if d > 49:
+            print("is almost certainly not random")
+        elif d > 45:
+            print("is suspected of being not random.")
+        elif d > 40:
+            print("is close to random, but not perfect.")
+        else:
+            print("looks random.")
+    print(f"- Arithmetic mean value of data {unit}s is {m:.4f} (random = {mid}).")
+    err = 100 * (math.fabs(PI - mc) / PI)
+    print(f"- Monte Carlo value for π is {mc:.9f} (error {err:.2f}%).")
+    print(f"- Serial correlation coefficient is {scc} (totally uncorrelated = 0.0).")
@@ -0,0 +1,254 @@
+# file: ent_profile.py
+# vim:fileencoding=utf-8:fdm=marker:ft=python
+#
+# Copyright © 2026 R.F. Smith <rsmith@xs4all.nl>.
+# SPDX-License-Identifier: MIT
+# Created: 2026-10-17T20:10:03+0200
+# Last modified: 2026-10-17T23:41:09+0200
+"""
+Measurement of the time and memory used by the stages of ‘ent’.
+
+For every stage, a record is made of the wall clock time, the processor time,
+the number of bytes processed and the peak of the memory allocated according
+to tracemalloc. A stage that is entered more than once for a file, like
+reading the file in chunks, gets a single record with the totals. The time
+of a stage does not include that of the stages within it.
+
+The code that does the work marks its stages with ``stage``, which measures
+them for the active ``Profiler``, and does nothing if there is none.
+Functions registered with ``register`` are called with every record, so that
+the figures can be exported by a program that uses ‘ent’. This module only
+uses the standard library. Since it is imported by every version of ‘ent’,
+the modules that are only needed when profiling are imported when they are
+used.
+"""
+
+import contextlib
+import time
+
+_callbacks = []
+_active = None
+
+
+def register(func):
+    """
+    Register a function to be called with every profile record.
+
+    Can also be used as a decorator.
+
+    Arguments:
+        func: Callable that takes a record dictionary with the keys “file”,
+            “stage”, “wall”, “cpu”, “bytes” and “peak”.
+
+    Returns:
+        The function itself.
+    """
+    _callbacks.append(func)
+    return func
+
+
+def unregister(func):
+    """
+    Remove a function that was registered with ``register``.
+
+    Arguments:
+        func: The function to remove.
+    """
+    _callbacks.remove(func)
+
+
+def stage(name, nbytes=None):
+    """
+    Measure a stage of the calculation with the active profiler.
+
+    Arguments:
+        name: Name of the stage.
+        nbytes: Number of bytes processed by the stage, or None if the stage
+            only uses figures derived from the data.
+
+    Returns:
+        A context manager like ``Profiler.stage``. Without an active
+        profiler, it only yields a dictionary.
+    """
+    if _active is None:
+        return contextlib.nullcontext({})
+    return _active.stage(name, nbytes)
+
+
+class Profiler:
+    """
+    Record the resources used by the stages of a calculation.
+
+    Use it as a context manager around the calculation; memory tracing is
+    started on entry and stopped on exit. Within it, the profiler is active
+    for ``stage`` in the thread and process that entered it. A disabled
+    profiler records nothing, so the same code can run with and without
+    profiling.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Create a profiler.
+
+        Arguments:
+            enabled: Record the stages.
+        """
+        self.enabled = enabled
+        self.records = []
+        self.file = None
+        self._index = {}
+        self._open = []
+        self._owner = None
+        self._previous = None
+        self._tracing = False
+
+    def __enter__(self):
+        global _active
+        if self.enabled:
+            import os
+            import threading
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            self._owner = (os.getpid(), threading.get_ident())
+            self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        if self.enabled:
+            _active, self._previous = self._previous, None
+        if self._tracing:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name, nbytes=None):
+        """
+        Measure a stage of the calculation for the current file.
+
+        Arguments:
+            name: Name of the stage.
+            nbytes: Number of bytes processed by the stage, if known
+                beforehand. It can also be set as the “bytes” item of the
+                yielded record. Leave it None for a stage that only uses
+                figures derived from the data.
+
+        Yields:
+            The record for the stage, a dictionary.
+        """
+        rec = {"file": self.file, "stage": name, "bytes": nbytes}
+        if not self.enabled or not self._owns():
+            yield rec
+            return
+        import tracemalloc
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # Resetting the peak also loses that of the enclosing stage.
+            if self._open:
+                outer = self._open[-1]
+                outer["peak"] = max(outer["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        inner = {"wall": 0.0, "cpu": 0.0, "peak": 0}
+        self._open.append(inner)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._open.pop()
+            peak = None
+            if tracing:
+                peak = max(inner["peak"], tracemalloc.get_traced_memory()[1])
+            if self._open:
+                outer = self._open[-1]
+                outer["wall"] += wall
+                outer["cpu"] += cpu
+                if tracing:
+                    outer["peak"] = max(outer["peak"], peak)
+            rec["wall"] = wall - inner["wall"]
+            rec["cpu"] = cpu - inner["cpu"]
+            rec["peak"] = peak
+            self._add(rec)
+
+    def take(self):
+        """
+        Return the records made so far, and start a new list.
+
+        The registered functions are called with every record.
+        """
+        rv, self.records, self._index = self.records, [], {}
+        for rec in rv:
+            for func in _callbacks:
+                func(rec)
+        return rv
+
+    def _owns(self):
+        """Return if the profiler was entered by this thread and process."""
+        import os
+        import threading
+
+        return self._owner == (os.getpid(), threading.get_ident())
+
+    def _add(self, rec):
+        """Add a record, or its figures to an earlier one for the stage."""
+        key = (rec["file"], rec["stage"])
+        old = self._index.get(key)
+        if old is None:
+            self._index[key] = rec
+            self.records.append(rec)
+            return
+        old["wall"] += rec["wall"]
+        old["cpu"] += rec["cpu"]
+        if rec["bytes"] is not None:
+            old["bytes"] = (old["bytes"] or 0) + rec["bytes"]
+        if rec["peak"] is not None:
+            old["peak"] = max(old["peak"] or 0, rec["peak"])
+
+
+def profileout(records, terse=False):
+    """
+    Print profile records after the normal output.
+
+    Arguments:
+        records: List of record dictionaries.
+        terse: Print CSV instead of text.
+    """
+    if terse:
+        print("6,Stage,Wall-time,CPU-time,Bytes,Peak-memory")
+        for r in records:
+            n = "" if r["bytes"] is None else r["bytes"]
+            peak = "" if r["peak"] is None else r["peak"]
+            print(f"7,{r['stage']},{r['wall']:.6f},{r['cpu']:.6f},{n},{peak}")
+        return
+    print("- Profile:")
+    for r in records:
+        line = f"  {r['stage']:<16} {r['wall']:10.6f} s wall {r['cpu']:10.6f} s CPU"
+        if r["bytes"] is not None:
+            line += f" {r['bytes']:12d} bytes"
+        else:
+            line += " " * 19
+        if r["peak"] is not None:
+            line += f" {r['peak'] / 2**20:10.3f} MiB peak"
+        print(line)
+
+
+def jsonout(records, path):
+    """
+    Append profile records to a file as JSON lines.
+
+    Arguments:
+        records: List of record dictionaries.
+        path: Path of the file.
+    """
+    import json
+
+    with open(path, "a") as outf:
+        for r in records:
+            outf.write(json.dumps(r) + "\n")
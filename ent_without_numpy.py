@@ -5,7 +5,7 @@
 # Copyright © 2018 R.F. Smith <rsmith@xs4all.nl>.
 # SPDX-License-Identifier: MIT
 # Created: 2012-08-25T23:37:50+0200
-# Last modified: 2022-08-27T10:50:17+0200
+# Last modified: 2026-10-17T23:58:14+0200
 """
 Partial implementation of the ‘ent’ program by John "Random" Walker in Python.
 
@@ -15,13 +15,23 @@ See http://www.fourmilab.ch/random/ for the original.
 """
 
 import argparse
-import collections
 import math
-import statistics as stat
 import sys
+from ent_accumulator import (
+    BLOCKSIZE,
+    CHUNKSIZE,
+    EntAccumulator,
+    accresult,
+    bitplanes,
+    histogram,
+    montecount,
+    readchunks,
+    serialproducts,
+)
+from ent_output import countout, terseout, textout
+from ent_profile import Profiler, jsonout, profileout
 
 __version__ = "2022.08.27"
-PI = 3.14159265358979323846
 
 
 def main(argv):
@@ -33,103 +43,137 @@ def main(argv):
     """
     opts = argparse.ArgumentParser(prog="ent", description=__doc__)
     opts.add_argument(
-        "-c", action="store_true", help="print occurrence counts (not implemented yet)"
+        "-b", action="store_true", help="treat the input as a stream of bits"
+    )
+    opts.add_argument("-c", action="store_true", help="print occurrence counts")
+    opts.add_argument(
+        "-s", action="store_true", help="stream the files in chunks (bounded memory)"
+    )
+    opts.add_argument(
+        "--chunksize",
+        metavar="N",
+        type=int,
+        default=CHUNKSIZE,
+        help=f"chunk size in bytes for streaming (default {CHUNKSIZE})",
+    )
+    opts.add_argument(
+        "--limit",
+        metavar="N",
+        type=int,
+        help="only analyse the first N bytes of every file",
     )
     opts.add_argument("-t", action="store_true", help="terse output in CSV format")
+    opts.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time and memory used by every stage",
+    )
+    opts.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="append the profile to FILE as JSON lines instead",
+    )
     opts.add_argument("-v", "--version", action="version", version=__version__)
     opts.add_argument(
-        "files", metavar="file", nargs="*", help="one or more files to process"
+        "files",
+        metavar="file",
+        nargs="*",
+        help="one or more files to process ('-' for standard input)",
     )
     args = opts.parse_args(argv)
-    for fname in args.files:
-        data, cnts = readdata(fname)
-        e = entropy(cnts)
-        c = pearsonchisquare(cnts)
-        p = pochisq(c)
-        d = math.fabs(p * 100 - 50)
-        m = monte_carlo(data)
-        try:
-            scc = correlation(data)
-            es = f"{scc:.6f}"
-        except ValueError:
-            es = "undefined"
-        if args.t:
-            terseout(data, e, c, p, d, es, m)
-        else:
-            textout(data, e, c, p, d, es, m)
+    if args.chunksize < 1:
+        opts.error("chunk size must be positive")
+    if args.limit is not None and args.limit < 1:
+        opts.error("the limit must be positive")
+    profiling = args.profile or args.profile_json is not None
+    status = 0
+    with Profiler(profiling) as prof:
+        for fname in args.files:
+            prof.file = fname
+            try:
+                if args.s or fname == "-" or args.limit is not None:
+                    acc = streamdata(fname, args.chunksize, args.limit)
+                else:
+                    with prof.stage("read") as rec:
+                        with open(fname, "rb") as inf:
+                            data = inf.read()
+                        rec["bytes"] = len(data)
+                    acc = EntAccumulator().update(data)
+                    del data
+                n, e, c, m, mc, scc = accresult(acc, args.b)
+            except (OSError, ValueError) as err:
+                print(f"ent: {fname}: {err}", file=sys.stderr)
+                prof.take()
+                status = 1
+                continue
+            if args.c:
+                countout(acc.bitcounts() if args.b else acc.counts, args.t)
+            es = "undefined" if scc is None else f"{scc:.6f}"
+            with prof.stage("pochisq"):
+                p = pochisq(c, 1 if args.b else 255)
+            d = math.fabs(p * 100 - 50)
+            if args.t:
+                terseout(n, m, e, c, p, d, es, mc, 1 if args.b else 8)
+            else:
+                textout(n, m, e, c, p, d, es, mc, 1 if args.b else 8)
+            if args.profile_json is not None:
+                jsonout(prof.take(), args.profile_json)
+            elif args.profile:
+                profileout(prof.take(), args.t)
+    return status
 
 
-def terseout(data, e, chi2, p, d, scc, mc):
+def readdata(name):
     """
-    Print the results in terse CSV.
+    Read the data from a file and count byte occurences.
 
     Arguments:
-        data: file contents
-        e: Entropy of the data in bits per byte.
-        chi2: Χ² value for the data.
-        p: Probability of normal z value.
-        d: Percent distance of p from centre.
-        scc: Serial correlation coefficient.
-        mc: Monte Carlo approximation of π.
+        name: Path of the file to read
+
+    Returns:
+        data: file contents as bytes.
+        cnts: list containing the occurance of each byte value 0−255.
     """
-    print("0,File-bytes,Entropy,Chi-square,Mean," "Monte-Carlo-Pi,Serial-Correlation")
-    n = len(data)
-    m = stat.fmean(data)
-    print(f"1,{n},{e:.6f},{chi2:.6f},{m:.6f},{mc:.6f},{scc}")
+    with open(name, "rb") as inf:
+        data = inf.read()
+    return data, bytecounts(data)
 
 
-def textout(data, e, chi2, p, d, scc, mc):
+def bytecounts(data):
     """
-    Print the results in plain text.
+    Count byte occurences, one block at a time.
 
     Arguments:
-        data: file contents
-        e: Entropy of the data in bits per byte.
-        chi2: Χ² value for the data.
-        p: Probability of normal z value.
-        d: Percent distance of p from centre.
-        scc: Serial correlation coefficient.
-        mc: Monte Carlo approximation of π.
+        data: bytes
+
+    Returns:
+        A list containing the occurance of each byte value 0−255.
     """
-    print(f"- Entropy is {e:.6f} bits per byte.")
-    print("- Optimum compression would reduce the size")
-    red = (100 * (8 - e)) / 8
-    n = len(data)
-    print(f"  of this {n} byte file by {red:.0f}%.")
-    print(f"- χ² distribution for {n} samples is {chi2:.2f}, and randomly")
-    pp = 100 * p
-    print(f"  would exceed this value {pp:.2f}% of the times.")
-    print("  According to the χ² test, this sequence", end=" ")
-    if d > 49:
-        print("is almost certainly not random")
-    elif d > 45:
-        print("is suspected of being not random.")
-    elif d > 40:
-        print("is close to random, but not perfect.")
-    else:
-        print("looks random.")
-    m = stat.fmean(data)
-    print(f"- Arithmetic mean value of data bytes is {m:.4f} (random = 127.5).")
-    err = 100 * (math.fabs(PI - mc) / PI)
-    print(f"- Monte Carlo value for π is {mc:.9f} (error {err:.2f}%).")
-    print(f"- Serial correlation coefficient is {scc} (totally uncorrelated = 0.0).")
+    cnts = [0] * 256
+    for j in range(0, len(data), BLOCKSIZE):
+        d = data[j : j + BLOCKSIZE]
+        cnts = [a + b for a, b in zip(cnts, histogram(bitplanes(d), len(d)))]
+    return cnts
 
 
-def readdata(name):
+def streamdata(name, size=CHUNKSIZE, limit=None):
     """
-    Read the data from a file and count byte occurences.
+    Read a file in chunks and accumulate the figures for the statistics.
+
+    Memory use is bounded by the chunk size.
 
     Arguments:
-        name: Path of the file to read
+        name: Path of the file to read, or '-' for standard input.
+        size: Number of bytes to read at a time.
+        limit: Maximum number of bytes to read, or None to read to the end.
 
     Returns:
-        data: file contents as bytes.
-        cnts: list containing the occurance of each byte value 0−255.
+        An EntAccumulator for the contents of the file.
     """
-    with open(name, "rb") as inf:
-        data = inf.read()
-    cnts = collections.Counter(data).values()
-    return data, cnts
+    acc = EntAccumulator()
+    for chunk in readchunks(name, size, limit=limit):
+        acc.update(chunk)
+    return acc
 
 
 def entropy(counts):
@@ -143,12 +187,25 @@ def entropy(counts):
         Entropy in bits per byte.
     """
     sz = sum(counts)
-    p = [n / sz for n in counts]
+    p = [n / sz for n in counts if n]
     c = math.log(256)
     ent = -sum(n * math.log(n) / c for n in p)
     return ent * 8
 
 
+def mean(counts):
+    """
+    Calculate the arithmetic mean of the data represented by the counts array.
+
+    Arguments:
+        counts: list containing the occurance of each byte value 0−255.
+
+    Returns:
+        The mean value of the bytes.
+    """
+    return sum(k * n for k, n in enumerate(counts)) / sum(counts)
+
+
 def pearsonchisquare(counts):
     """
     Calculate Pearson's χ² (chi square) test for an array of bytes.
@@ -166,21 +223,34 @@ def pearsonchisquare(counts):
     return sum((c - np) ** 2 / np for c in counts)
 
 
-def correlation(d):
+def correlation(d, counts=None):
     """
     Calculate the serial correlation coefficient of the data.
 
+    The products of successive bytes are summed from bit planes, see
+    ``serialproducts`` in ent_accumulator.py. The sums of the bytes and
+    their squares follow from the byte counts.
+
     Arguments:
         d: data in the form of bytes.
+        counts: Optional list containing the occurance of each byte value
+            0−255 in d. Calculated if not given.
 
     Returns:
         Serial correlation coeffiecient.
     """
     totalc = len(d)
-    b = d[1:] + bytes(d[0])
-    scct1 = sum(i * j for i, j in zip(d, b))
-    scct2 = sum(d) ** 2
-    scct3 = sum(j * j for j in d)
+    if totalc == 0:
+        raise ValueError
+    if counts is None:
+        counts = bytecounts(d)
+    scct1 = d[-1] * d[0]
+    for j in range(0, totalc, BLOCKSIZE):
+        scct1 += serialproducts(bitplanes(d[j : j + BLOCKSIZE]))
+        if j + BLOCKSIZE < totalc:
+            scct1 += d[j + BLOCKSIZE - 1] * d[j + BLOCKSIZE]
+    scct2 = sum(k * n for k, n in enumerate(counts)) ** 2
+    scct3 = sum(k * k * n for k, n in enumerate(counts))
     scc = totalc * scct3 - scct2
     if scc == 0:
         raise ValueError
@@ -226,8 +296,8 @@ def pochisq(x, df=255):
     even = df % 2 == 0
     if df > 1:
         y = math.exp(-a)
-    nd = stat.NormalDist()
-    s = y if even else 2.0 * nd.cdf(-math.sqrt(x))
+    # 2·Φ(−√x) = erfc(√(x/2))
+    s = y if even else math.erfc(math.sqrt(a))
     if df > 2:
         x = 0.5 * (df - 1.0)
         z = 1.0 if even else 0.5
@@ -261,17 +331,11 @@ def monte_carlo(d):
     Returns:
         Approximation of π
     """
-    values = [
-        a * 65536.0 + b * 256.0 + c * 1.0 for a, b, c in zip(d[0::3], d[1::3], d[2::3])
-    ]
-    montex = values[0::2]
-    montey = values[1::2]
-    dist2 = (i * i + j * j for i, j in zip(montex, montey))
-    # constant in the next line is (256.0 ** 3 - 1) ** 2
-    inmont = sum(k <= 281474943156225.0 for k in dist2)
-    montepi = 4 * inmont / len(montex)
+    montec = len(d) // 6
+    inmont = montecount(memoryview(d)[: montec * 6])
+    montepi = 4 * inmont / montec
     return montepi
 
 
 if __name__ == "__main__":
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))
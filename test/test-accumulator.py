@@ -0,0 +1,112 @@
+# file: test-accumulator.py
+# vim:fileencoding=utf-8:ft=python
+#
+# Author: R.F. Smith <rsmith@xs4all.nl>
+# Created: 2026-10-17T10:58:20+0200
+# Last modified: 2026-10-17T23:24:31+0200
+"""Test the incremental calculation in ent_accumulator.py by comparing the
+results for data processed in pieces to those for the data as a whole.
+
+Use “py.test -v test/test-accumulator.py” from the main directory to run
+these tests.
+"""
+
+import functools
+import random
+import sys
+
+import pytest
+
+sys.path.insert(1, ".")
+
+
+from ent_accumulator import EntAccumulator  # noqa
+
+rnd = random.Random(20261017)
+data = rnd.randbytes(100003)
+whole = EntAccumulator().update(data)
+
+
+def pieces(cls, cuts):
+    """Create accumulators for the segments of data between the cuts."""
+    cuts = [0] + cuts + [len(data)]
+    return [cls(a).update(data[a:b]) for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def same(a, b):
+    assert a.n == b.n
+    assert list(a.counts) == list(b.counts)
+    assert a.scct1 == b.scct1
+    assert a.bitpairs == b.bitpairs
+    assert (a.first, a.last) == (b.first, b.last)
+    assert (a.inmont, a.montec, a.mctail) == (b.inmont, b.montec, b.mctail)
+    assert a.result() == b.result()
+    assert a.bitresult() == b.bitresult()
+
+
+def test_whole():
+    assert whole.n == len(data)
+    assert whole.montec == len(data) // 6
+    assert whole.result()[0] == len(data)
+
+
+def test_update():
+    acc = EntAccumulator()
+    for j in range(0, len(data), 1013):
+        acc.update(data[j : j + 1013])
+    same(acc, whole)
+
+
+def test_merge():
+    for _ in range(20):
+        cuts = sorted(rnd.sample(range(1, len(data)), rnd.randint(1, 7)))
+        accs = pieces(EntAccumulator, cuts)
+        acc = accs[0]
+        for other in accs[1:]:
+            acc.merge(other)
+        same(acc, whole)
+
+
+def test_merge_small():
+    cuts = [1, 2, 4, 5, 9, 10, 11, 13, 20]
+    accs = pieces(EntAccumulator, cuts)
+    acc = EntAccumulator()
+    for other in accs:
+        acc.merge(other)
+    same(acc, whole)
+
+
+def test_not_adjacent():
+    with pytest.raises(ValueError):
+        EntAccumulator().update(data[:10]).merge(EntAccumulator(11))
+
+
+def test_numpy():
+    ent = pytest.importorskip("ent")
+    cuts = sorted(rnd.sample(range(1, len(data)), 5))
+    accs = pieces(functools.partial(ent.NumpyAccumulator, bits=True), cuts)
+    acc = accs[0]
+    for other in accs[1:]:
+        acc.merge(other)
+    same(acc, whole)
+    # Without bits, the bit pairs are not counted.
+    acc = ent.NumpyAccumulator().update(data)
+    assert acc.bitpairs is None
+    assert acc.result() == whole.result()
+    with pytest.raises(ValueError):
+        acc.bitresult()
+    acc.merge(ent.NumpyAccumulator(len(data), bits=True))
+    assert acc.bitpairs is None
+
+
+def test_bits():
+    bits = "".join(f"{j:08b}" for j in data)
+    n, e, chi2, m, mc, scc = whole.bitresult()
+    ones = bits.count("1")
+    pairs = sum(a == b == "1" for a, b in zip(bits, bits[1:] + bits[0]))
+    assert n == len(bits)
+    assert whole.bitcounts() == (n - ones, ones)
+    assert m == ones / n
+    assert chi2 == pytest.approx(((n - 2 * ones) ** 2) / n)
+    assert scc == pytest.approx((n * pairs - ones**2) / (n * ones - ones**2))
+    assert mc == whole.montepi()
@@ -0,0 +1,86 @@
+# file: test-api.py
+# vim:fileencoding=utf-8:ft=python
+#
+# Author: R.F. Smith <rsmith@xs4all.nl>
+# Created: 2026-10-17T21:36:18+0200
+# Last modified: 2026-10-18T01:17:05+0200
+"""Test the library interface in ent_api.py.
+
+Use “py.test -v test/test-api.py” from the main directory to run these
+tests.
+"""
+
+import csv
+import io
+import json
+import random
+import sys
+
+import pytest
+
+sys.path.insert(1, ".")
+
+
+from ent_accumulator import EntAccumulator  # noqa
+from ent_api import CSVWriter, EntResult, NDJSONWriter, analyze  # noqa
+from ent_without_numpy import pochisq  # noqa
+
+rnd = random.Random(20261017)
+data = rnd.randbytes(10007)
+
+
+def test_sources(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(data)
+    r = analyze(path, size=1000)
+    assert r.file == str(path)
+    n, e, c, m, mc, scc = EntAccumulator().update(data).result()
+    assert (r.n, r.entropy, r.chisquare, r.mean) == (n, e, c, m)
+    assert (r.montepi, r.correlation) == (mc, scc)
+    assert r.p == pochisq(c)
+    assert analyze(data, name=str(path)) == r
+    assert analyze(bytearray(data), name=str(path), size=333) == r
+    with open(path, "rb") as inf:
+        assert analyze(inf, size=4096) == r
+    with pytest.raises(TypeError):
+        analyze(12)
+
+
+def test_options():
+    r = analyze(data, limit=5000)
+    assert r == analyze(data[:5000])
+    b = analyze(io.BytesIO(data), bits=True, limit=5000)
+    assert (b.n, b.width) == (40000, 1)
+    assert b.p == pochisq(b.chisquare, 1)
+    assert not hasattr(r, "__dict__")
+    assert list(r) == [r.asdict()[k] for k in EntResult.FIELDS]
+    with pytest.raises(ValueError):
+        analyze(b"")
+
+
+def strict(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+
+def test_writers():
+    results = [
+        analyze(data[k : k + 500], name=f"part,{k}") for k in range(0, 5000, 500)
+    ]
+    out = io.StringIO()
+    with CSVWriter(out, rows=3) as w:
+        w.writemany(results)
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert len(rows) == 11 and rows[0][0] == "0"
+    assert [r[-1] for r in rows[1:]] == [r.file for r in results]
+    assert float(rows[1][4]) == pytest.approx(results[0].p, rel=1e-5)
+    out = io.StringIO()
+    with NDJSONWriter(out, rows=4) as w:
+        w.write(analyze(b"aaa"))
+        w.writemany(results)
+    recs = [
+        json.loads(line, parse_constant=strict) for line in out.getvalue().splitlines()
+    ]
+    assert recs[0]["serial-correlation"] is None
+    assert recs[0]["monte-carlo-pi"] is None
+    assert recs[1]["entropy"] == results[0].entropy
+    assert [r["file"] for r in recs[1:]] == [r.file for r in results]
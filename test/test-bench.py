@@ -0,0 +1,93 @@
+# file: test-bench.py
+# vim:fileencoding=utf-8:ft=python
+#
+# Author: R.F. Smith <rsmith@xs4all.nl>
+# Created: 2026-10-17T19:58:40+0200
+# Last modified: 2026-10-18T00:41:27+0200
+"""Test the benchmark helpers in ent_bench.py.
+
+Use “py.test -v test/test-bench.py” from the main directory to run these
+tests.
+"""
+
+import sys
+
+import pytest
+
+sys.path.insert(1, ".")
+
+
+from ent_bench import Bytewise, compareruns, makeinput, measurestages  # noqa
+from ent_bench import parsesize, totals  # noqa
+import ent_without_numpy  # noqa
+
+
+def test_parsesize():
+    assert parsesize("1K") == 1024
+    assert parsesize("3m") == 3 << 20
+    assert parsesize("2G") == 2 << 30
+    assert parsesize("100") == 100
+    with pytest.raises(ValueError):
+        parsesize("0K")
+
+
+def test_makeinput(tmp_path):
+    for kind in ("random", "zero", "text"):
+        a, b = tmp_path / f"{kind}-a", tmp_path / f"{kind}-b"
+        makeinput(a, kind, (1 << 20) + 7)
+        makeinput(b, kind, (1 << 20) + 7)
+        assert a.read_bytes() == b.read_bytes()
+        assert a.stat().st_size == (1 << 20) + 7
+    assert not any((tmp_path / "zero-a").read_bytes())
+    assert (tmp_path / "text-a").read_bytes().isascii()
+
+
+def test_measure(tmp_path):
+    name = tmp_path / "random"
+    makeinput(name, "random", 10000)
+    rv = measurestages("ent_without_numpy", str(name))
+    assert rv["size"] == 10000
+    assert list(rv["stages"]) == [
+        "readdata",
+        "entropy",
+        "pearsonchisquare",
+        "pochisq",
+        "correlation",
+        "monte_carlo",
+    ]
+    assert all(s["seconds"] >= 0 and s["peak"] >= 0 for s in rv["stages"].values())
+
+
+def test_bytewise(tmp_path):
+    name = tmp_path / "random"
+    makeinput(name, "random", 10000)
+    rv = measurestages("bytewise", str(name))
+    assert list(rv["stages"]) == list(
+        measurestages("ent_without_numpy", str(name))["stages"]
+    )
+    data, counts = ent_without_numpy.readdata(str(name))
+    assert Bytewise.correlation(data) == pytest.approx(
+        ent_without_numpy.correlation(data)
+    )
+    assert Bytewise.entropy(Bytewise.readdata(str(name))[1]) == pytest.approx(
+        ent_without_numpy.entropy(counts)
+    )
+
+
+def test_totals():
+    stages = {"readdata": {"seconds": 0.5}, "pochisq": {"seconds": 0.25}}
+    recs = [{"backend": b, "stages": stages} for b in ("ent", "bytewise")]
+    assert totals({"results": recs}) == {"ent": 0.75, "bytewise": 0.75}
+
+
+def test_compare():
+    def run(seconds):
+        stages = {"readdata": {"seconds": seconds}, "pochisq": {"seconds": 1e-5}}
+        rec = {"backend": "ent", "kind": "random", "size": 1024, "stages": stages}
+        return {"results": [rec]}
+
+    assert compareruns(run(1.0), run(1.05)) == []
+    assert compareruns(run(1.0), run(1.2)) == [
+        ("ent", "random", 1024, "readdata", 1.0, 1.2)
+    ]
+    assert compareruns(run(1e-4), run(1e-3 / 2)) == []
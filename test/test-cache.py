@@ -0,0 +1,68 @@
+# file: test-cache.py
+# vim:fileencoding=utf-8:ft=python
+#
+# Author: R.F. Smith <rsmith@xs4all.nl>
+# Created: 2026-10-17T17:24:06+0200
+# Last modified: 2026-10-17T17:24:06+0200
+"""Test the result cache in ent_cache.py.
+
+Use “py.test -v test/test-cache.py” from the main directory to run these
+tests.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(1, ".")
+
+
+from ent_accumulator import EntAccumulator  # noqa
+from ent_cache import ResultCache  # noqa
+
+rnd = random.Random(20261017)
+data = rnd.randbytes(10007)
+
+
+def test_state():
+    acc = EntAccumulator().update(data[:5000])
+    copy = EntAccumulator.fromstate(acc.state())
+    assert copy.result() == acc.result()
+    copy.update(data[5000:])
+    assert copy.result() == EntAccumulator().update(data).result()
+
+
+def test_cache(tmp_path):
+    name = tmp_path / "data.bin"
+    name.write_bytes(data)
+    state = EntAccumulator().update(data).state()
+    with ResultCache(tmp_path / "cache.db") as cache:
+        key = cache.key(name)
+        assert cache.get(key) is None
+        cache.put(key, state)
+        assert cache.get(key) == state
+    with ResultCache(tmp_path / "cache.db", refresh=True) as cache:
+        assert cache.get(key) is None
+    st = os.stat(name)
+    os.utime(name, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+    with ResultCache(tmp_path / "cache.db") as cache:
+        assert cache.get(cache.key(name)) is None
+
+
+def test_hash(tmp_path):
+    first, second = tmp_path / "first.bin", tmp_path / "second.bin"
+    first.write_bytes(data)
+    second.write_bytes(data)
+    with ResultCache(tmp_path / "cache.db", usehash=True) as cache:
+        cache.put(cache.key(first), {"n": len(data)})
+        assert cache.get(cache.key(second)) == {"n": len(data)}
+
+
+def test_eviction(tmp_path):
+    with ResultCache(tmp_path / "cache.db", maxentries=2) as cache:
+        for j in range(4):
+            cache.put((f"file{j}", ""), {"n": j})
+        cache.get(("file0", ""))
+    with ResultCache(tmp_path / "cache.db") as cache:
+        found = [j for j in range(4) if cache.get((f"file{j}", "")) is not None]
+    assert found == [0, 3]
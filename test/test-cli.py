@@ -0,0 +1,121 @@
+# file: test-cli.py
+# vim:fileencoding=utf-8:ft=python
+#
+# Author: R.F. Smith <rsmith@xs4all.nl>
+# Created: 2026-10-17T21:03:05+0200
+# Last modified: 2026-10-18T01:40:22+0200
+"""Test the choice of version and the start-up time of ent_cli.py.
+
+Use “py.test -v test/test-cli.py” from the main directory to run these
+tests.
+"""
+
+import importlib.util
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(1, ".")
+
+
+import ent_cli  # noqa
+
+# Maximum cumulative import time of ent_cli itself in microseconds.
+STARTBUDGET = 10000
+
+
+def importtimes(code):
+    """Run code with “-X importtime”, return {module: cumulative µs}."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    rv = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rv[name.strip()] = int(cumulative)
+    return rv
+
+
+def test_importtime():
+    code = "import ent_cli; ent_cli.main(['--backend', '{}', '--version'])"
+    times = importtimes(code.format("python"))
+    assert "numpy" not in times
+    assert times["ent_cli"] < STARTBUDGET
+    # The lazy import of the version without numpy has to be much cheaper
+    # than that of the numpy version, or choosing it would not pay off.
+    if importlib.util.find_spec("numpy") is not None:
+        numpytimes = importtimes(code.format("numpy"))
+        assert times["ent_without_numpy"] < numpytimes["ent"] / 2
+
+
+def test_small(tmp_path):
+    name = tmp_path / "small"
+    name.write_bytes(bytes(range(256)) * 4)
+    code = (
+        f"import sys, ent_cli; ent_cli.main(['-t', {str(name)!r}]); "
+        "print('ent_without_numpy' in sys.modules, 'numpy' in sys.modules)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert out.stdout.splitlines()[-1] == "True False"
+
+
+def test_lazy(tmp_path):
+    pytest.importorskip("numpy")
+    name = tmp_path / "data"
+    name.write_bytes(bytes(range(256)) * 4)
+    lazy = ("json", "hashlib", "sqlite3", "concurrent.futures", "ent_cache")
+    code = (
+        f"import sys, ent; ent.main(['-t', {str(name)!r}]); "
+        f"print([m for m in {lazy!r} if m in sys.modules])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert out.stdout.splitlines()[-1] == "[]"
+    ent, ent_cache = importlib.import_module("ent"), importlib.import_module(
+        "ent_cache"
+    )
+    assert ent.CACHEENTRIES == ent_cache.MAXENTRIES
+
+
+def test_choose(tmp_path):
+    pytest.importorskip("numpy")
+    small, large = tmp_path / "small", tmp_path / "large"
+    small.write_bytes(bytes(1000))
+    large.write_bytes(bytes(ent_cli.SMALLINPUT))
+    assert ent_cli.choose(["-t", str(small)]) == "python"
+    assert ent_cli.choose(["--chunksize", "4096", str(small)]) == "python"
+    assert ent_cli.choose([str(large)]) == "numpy"
+    assert ent_cli.choose(["-m", str(small)]) == "numpy"
+    assert ent_cli.choose(["-"]) == "numpy"
+
+
+def test_backend(tmp_path, capsys):
+    name = tmp_path / "data"
+    name.write_bytes(bytes(range(256)) * 10)
+    ent_cli.main(["--backend", "decimal", "-t", str(name)])
+    # Only the decimal version prints this many digits.
+    assert ",8.000000000000000000000000" in capsys.readouterr().out
+    assert ent_cli.main(["--backend", "nonsense", str(name)]) == 2
+    assert capsys.readouterr().err.startswith("ent: --backend must be one of")
+    assert ent_cli.main(["--backend"]) == 2
+    ent_cli.main(["--backend=python", "-t", str(name)])
+    assert capsys.readouterr().out.splitlines()[-1].startswith("1,2560,8.000000,")
+
+
+def test_version(capsys):
+    for backend, module in (
+        ("python", "ent_without_numpy"),
+        ("decimal", "ent_decimal"),
+    ):
+        with pytest.raises(SystemExit):
+            ent_cli.main([f"--backend={backend}", "--version"])
+        assert capsys.readouterr().out.strip() == sys.modules[module].__version__
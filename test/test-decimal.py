@@ -0,0 +1,69 @@
+# file: test-decimal.py
+# vim:fileencoding=utf-8:ft=python
+#
+# Author: R.F. Smith <rsmith@xs4all.nl>
+# Created: 2026-10-18T00:12:36+0200
+# Last modified: 2026-10-18T01:31:55+0200
+"""Test the Decimal calculations in ent_decimal.py.
+
+Use “py.test -v test/test-decimal.py” from the main directory to run these
+tests.
+"""
+
+import decimal
+import math
+import sys
+from decimal import Decimal
+
+sys.path.insert(1, ".")
+
+
+import ent_decimal  # noqa
+import ent_without_numpy  # noqa
+
+
+def test_pi():
+    with decimal.localcontext() as ctx:
+        ctx.prec = 50
+        assert ent_decimal.pi() == ent_decimal.PI
+
+
+def test_erfc():
+    for x in (0.0, 0.1, 1.0, 2.5, 4.47, 4.48, 7.0, 27.0):
+        rv = float(ent_decimal.erfc(Decimal(x)))
+        assert math.isclose(rv, math.erfc(x), rel_tol=1e-13)
+    # Both methods agree near the switch at x² = 20.
+    with decimal.localcontext() as ctx:
+        ctx.prec = 40
+        h = Decimal("1e-30")
+        a = ent_decimal.erfc(Decimal(20).sqrt() - h)
+        b = ent_decimal.erfc(Decimal(20).sqrt() + h)
+        # The derivative of erfc(x) is −2/√π·exp(−x²).
+        slope = 2 / ent_decimal.pi().sqrt() * Decimal(-20).exp()
+        assert abs((a - b) / (2 * h) / slope - 1) < Decimal("1e-8")
+
+
+def test_pochisq():
+    for x in (200, 255, 300, 400):
+        rv = float(ent_decimal.pochisq(Decimal(x)))
+        assert math.isclose(rv, ent_without_numpy.pochisq(x), rel_tol=1e-9)
+    assert ent_decimal.pochisq(Decimal(0)) == 1
+
+
+def test_counts(tmp_path, capsys):
+    name = tmp_path / "data"
+    name.write_bytes(bytes(range(256)) * 3)
+    ent_decimal.main(["-c", "-t", str(name)])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "2,Value,Occurrences,Fraction"
+    assert lines[1:257] == [f"3,{j},3,0.003906" for j in range(256)]
+    assert lines[257].startswith("0,File-bytes")
+
+
+def test_zeros(tmp_path, capsys):
+    name = tmp_path / "zeros"
+    name.write_bytes(bytes(1000))
+    ent_decimal.main(["-t", str(name)])
+    assert capsys.readouterr().out.splitlines()[1].startswith("1,1000,0,")
+    ent_decimal.main([str(name)])
+    assert "Entropy is 0 bits per byte." in capsys.readouterr().out
@@ -3,7 +3,7 @@
 #
 # Author: R.F. Smith <rsmith@xs4all.nl>
 # Created: 2017-02-26 23:08:58 +0100
-# Last modified: 2018-04-17T22:09:45+0200
+# Last modified: 2026-10-18T01:47:09+0200
 """Test routines from ent.py by comparing the results from a known batch of
 random data to the results given by John Walker's ent.
 
@@ -11,12 +11,47 @@ Use “pytest-3.6 -v test/test_routines.py” from the main directory to run the
 tests.
 """
 
+import json
+import math
+import os
+import subprocess
 import sys
+import threading
+
+import numpy as np
+import pytest
 
 sys.path.insert(1, ".")
 
 
-from ent import readdata, entropy, pearsonchisquare, correlation, monte_carlo  # noqa
+from ent import (
+    readdata,
+    entropy,
+    pearsonchisquare,
+    correlation,
+    monte_carlo,
+    streamdata,
+    parallel,
+    mapdata,
+    batch,
+    readnames,
+    analyse,
+    montecount,
+    pochisq,
+    windows,
+    serialsums,
+    productsum,
+    resume,
+    sample,
+    verdict,
+    follow,
+    NumpyAccumulator,
+    PairAccumulator,
+    paircounts,
+    pairstats,
+)  # noqa
+from ent_accumulator import EntAccumulator  # noqa
+import ent_without_numpy  # noqa
 
 goodtxt = """0,File-bytes,Entropy,Chi-square,Mean,Monte-Carlo-Pi,Serial-Correlation
 1,10485760,7.999982,259.031104,127.511638,3.139878,-0.000296"""
@@ -58,3 +93,402 @@ def test_mc():
     e = good["Monte-Carlo-Pi"]
     d = 0.001
     assert (e - d) < monte_carlo(data) < (e + d)
+
+
+def test_stream():
+    acc = streamdata("test/random.dat", 65537)
+    assert acc.n == len(data)
+    assert list(acc.counts) == list(counts)
+    assert acc.montepi() == monte_carlo(data)
+    assert abs(acc.correlation() - correlation(data)) < 1e-12
+
+
+def test_parallel():
+    acc = parallel("test/random.dat", 3, 65537)
+    assert acc.result() == streamdata("test/random.dat").result()
+
+
+def test_batch(tmp_path):
+    names = []
+    for j in range(1, 70):
+        name = str(tmp_path / f"part{j}")
+        data[: j * 997].tofile(name)
+        names.append(name)
+    lst = tmp_path / "list"
+    lst.write_bytes(b"\0".join(n.encode() for n in names))
+    assert list(readnames(str(lst), null=True)) == names
+    rows = list(batch(readnames(str(lst), null=True), 2))
+    assert [r[0] for r in rows] == names
+    n, e, c, m, mc, scc = analyse(names[-1])
+    assert rows[-1][1][0] == n
+    assert abs(rows[-1][1][1] - e) < 1e-12
+    short = str(tmp_path / "short")
+    data[:3].tofile(short)
+    missing = str(tmp_path / "missing")
+    args = [sys.executable, "ent.py", "-@", str(lst), "-0", "--json", short, missing]
+    out = subprocess.run(args, capture_output=True, text=True)
+    assert out.returncode == 1 and out.stderr.startswith(f"ent: {missing}: ")
+    assert "NaN" not in out.stdout
+    recs = [json.loads(line) for line in out.stdout.splitlines()]
+    assert recs[0]["monte-carlo-pi"] is None and len(recs) == 70
+    # More output than fits in the pipe, which is closed after one line.
+    args = args[:-3] + names * 10
+    with subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as p:
+        p.stdout.readline()
+        p.stdout.close()
+        assert b"Traceback" not in p.stderr.read()
+
+
+def test_mapped():
+    assert (
+        mapdata("test/random.dat", 100000).result()
+        == streamdata("test/random.dat").result()
+    )
+
+
+def reference_montecount(d):
+    """The original floating point Monte Carlo calculation."""
+    d = np.array(d, copy=True, dtype=np.float64)
+    d = d[: len(d) // 6 * 6]
+    values = np.sum(d.reshape((-1, 3)) * np.array([256**2, 256, 1]), axis=1)
+    montex = values[0::2]
+    montey = values[1::2]
+    dist2 = montex * montex + montey * montey
+    return np.count_nonzero(dist2 <= (256.0**3 - 1) ** 2)
+
+
+def test_montecount():
+    d = data[: len(data) // 6 * 6]
+    expected = reference_montecount(d)
+    assert montecount(d) == expected
+    assert montecount(d, lut=False) == expected
+
+
+def test_montecount_edges():
+    r = 256**3 - 1
+    rnd = np.random.default_rng(6)
+    x = rnd.integers(0, 256**3, 20000)
+    y = np.array([math.isqrt(r * r - int(j) * int(j)) for j in x])
+    x = np.concatenate((x, x, x, [0, r, r, 0, r]))
+    y = np.concatenate((y, y + 1, y - 1, [0, 0, r, r, 1]))
+    y = np.clip(y, 0, r)
+    points = np.stack((x, y), axis=1)
+    d = np.zeros((len(points), 2, 3), np.ubyte)
+    for k, shift in enumerate((16, 8, 0)):
+        d[:, :, k] = (points >> shift) & 0xFF
+    d = d.ravel()
+    expected = reference_montecount(d)
+    assert montecount(d) == expected
+    assert montecount(d, lut=False) == expected
+    for v in (0, 255):
+        d = np.full(6006, v, np.ubyte)
+        assert montecount(d) == reference_montecount(d)
+
+
+def reference_correlation(d):
+    """The original floating point serial correlation calculation."""
+    totalc = len(d)
+    a = np.array(d, np.float64)
+    b = np.roll(a, -1)
+    scct1 = np.sum(a * b)
+    scct2 = np.sum(a) ** 2
+    scct3 = np.sum(a * a)
+    scc = totalc * scct3 - scct2
+    if scc == 0:
+        raise ValueError
+    return (totalc * scct1 - scct2) / scc
+
+
+def test_correlation_reference():
+    assert abs(correlation(data) - reference_correlation(data)) < 1e-9
+    short = data[:70001]
+    assert abs(correlation(short) - reference_correlation(short)) < 1e-12
+
+
+def test_correlation_adversarial():
+    for v in (0, 1, 255):
+        d = np.full(200003, v, np.ubyte)
+        with pytest.raises(ValueError):
+            correlation(d)
+        with pytest.raises(ValueError):
+            reference_correlation(d)
+    d = np.tile(np.array([0, 255], np.ubyte), 100000)
+    assert correlation(d) == reference_correlation(d) == -1.0
+    d = np.tile(np.array([0, 0, 255, 255], np.ubyte), 50001)
+    assert abs(correlation(d) - reference_correlation(d)) < 1e-12
+    d = np.repeat(np.array([7, 250], np.ubyte), 65537)
+    assert abs(correlation(d) - reference_correlation(d)) < 1e-12
+    for d in (np.full(200003, 255, np.ubyte), data):
+        assert productsum(d) == serialsums(d)[0]
+    assert productsum(data[:1]) == 0
+
+
+def test_kernel():
+    pytest.importorskip("ent_kernel")
+    d = data[:200003]
+    acc = NumpyAccumulator(5)
+    for j in range(0, len(d), 30011):
+        acc.update(d[j : j + 30011])
+    ref = EntAccumulator(5).update(d)
+    assert list(acc.counts) == list(ref.counts)
+    assert (acc.scct1, acc.inmont, acc.montec) == (ref.scct1, ref.inmont, ref.montec)
+
+
+def test_pochisq():
+    # The scalar version in ent_without_numpy.py is the reference. The
+    # values for x > 40 use the a > BIGX branch there.
+    for df in (1, 2, 3, 4, 63, 254, 255, 256, 1023):
+        x = np.concatenate(
+            (np.geomspace(1e-3, 10 * df + 1000, 500), np.linspace(1, 3 * df, 500))
+        )
+        ref = np.array([ent_without_numpy.pochisq(float(j), df) for j in x])
+        p = pochisq(x, df)
+        assert np.allclose(p, ref, rtol=1e-12, atol=1e-12)
+        assert pochisq(float(x[100]), df) == p[100]
+    assert pochisq(0.0) == 1.0
+    assert list(pochisq(np.array([-1.0, 0.0]))) == [1.0, 1.0]
+    with pytest.raises(ValueError):
+        pochisq(1.0, 2.5)
+
+
+def test_windows(tmp_path, monkeypatch):
+    rnd = np.random.default_rng(20261017)
+    d = rnd.integers(0, 256, 50000, dtype=np.ubyte)
+    d[20000:30000] = rnd.integers(0, 16, 10000)  # low entropy region
+    name = tmp_path / "windows.dat"
+    d.tofile(name)
+    for width, step, size in ((4096, 4096, 1000), (3000, 7, 4096), (1000, 2500, 333)):
+        rec = np.concatenate(list(windows(name, width, step, size)))
+        offsets = range(0, len(d) - width + 1, step)
+        assert list(rec["offset"]) == list(offsets)
+        for r in rec[::50]:
+            w = d[r["offset"] : r["offset"] + width]
+            cnts = np.bincount(w, minlength=256)
+            assert math.isclose(r["entropy"], entropy(cnts), abs_tol=1e-9)
+            assert math.isclose(r["chisquare"], pearsonchisquare(cnts), rel_tol=1e-12)
+            assert r["mean"] == w.mean()
+    # Counts beyond the c·log(c) table are calculated directly.
+    whole = np.concatenate(list(windows(name, 3000, 700)))
+    monkeypatch.setattr("ent.WINDOWTABLE", 100)
+    capped = np.concatenate(list(windows(name, 3000, 700)))
+    assert np.allclose(capped["entropy"], whole["entropy"], rtol=0, atol=1e-9)
+    for opts in (["-j", "2", "--window", "4096"], ["-s", "-m"], ["-s", "-j", "2"]):
+        out = subprocess.run(
+            [sys.executable, "ent.py", *opts, str(name)], capture_output=True
+        )
+        assert out.returncode == 2 and b"cannot" in out.stderr
+
+
+def test_bits():
+    rnd = np.random.default_rng(20261017)
+    d = rnd.integers(0, 256, 100003, dtype=np.ubyte)
+    acc = NumpyAccumulator(bits=True).update(d)
+    b = np.unpackbits(d).astype(np.int64)
+    n, ones = len(b), int(b.sum())
+    pairs = int(np.dot(b, np.roll(b, -1)))
+    assert acc.bitpairs == int(np.count_nonzero(d[:-1] & (d[1:] >> 7)))
+    assert acc.bitresult() == EntAccumulator().update(d).bitresult()
+    scc = acc.bitresult()[5]
+    assert scc == pytest.approx((n * pairs - ones**2) / (n * ones - ones**2))
+
+
+def test_symbols(tmp_path):
+    rnd = np.random.default_rng(20261017)
+    d = rnd.integers(0, 256, 40003, dtype=np.ubyte)
+    name = tmp_path / "symbols.dat"
+    d.tofile(name)
+    for bits in (16, 32):
+        data, cnts = readdata(name, bits)
+        k = bits // 8
+        values = [
+            int.from_bytes(d[j : j + k], "little") for j in range(0, len(d) - k + 1, k)
+        ]
+        assert list(data) == values
+        assert cnts.sum() == len(values) and sorted(cnts[cnts > 0]) == sorted(
+            np.unique(values, return_counts=True)[1]
+        )
+        prod = sum(a * b for a, b in zip(values, values[1:]))
+        assert serialsums(data) == (prod, sum(values), sum(j * j for j in values))
+    data, cnts = readdata(name, 16)
+    sparse = np.unique(data, return_counts=True)[1]
+    assert math.isclose(pearsonchisquare(sparse, 65536), pearsonchisquare(cnts, 65536))
+    assert math.isclose(entropy(sparse), entropy(cnts))
+    # Wilson–Hilferty approximation for very many degrees of freedom.
+    df = (1 << 20) - 1
+    for x in (df - 2000, df, df + 2000):
+        assert abs(pochisq(x, df + 2) - pochisq(x, df)) < 1e-3
+    short = str(tmp_path / "short")
+    d[:3].tofile(short)
+    out = subprocess.run(
+        [sys.executable, "ent.py", "-t", "--symbol-bits", "32", short, str(name)],
+        capture_output=True,
+        text=True,
+    )
+    assert out.stderr == f"ent: {short}: shorter than one symbol\n"
+    assert out.stdout.splitlines()[-1].startswith("1,10000,")
+    # Far fewer than 5 expected occurrences of every 32-bit value.
+    out = subprocess.run(
+        [sys.executable, "ent.py", "--symbol-bits", "32", str(name)],
+        capture_output=True,
+        text=True,
+    )
+    assert "the χ² test is unreliable" in out.stdout
+    assert "According to the χ² test" not in out.stdout
+    assert "would exceed this value" not in out.stdout
+
+
+def test_resume(tmp_path):
+    name = str(tmp_path / "capture")
+    with open(name, "wb") as outf:
+        for end in (1, 5, 4099, 100003, 100003, 200017):
+            outf.write(data[outf.tell() : end].tobytes())
+            outf.flush()
+            assert resume(name, 1000).result() == analyse(name)
+    # Rewritten instead of appended to.
+    data[1:200018].tofile(name)
+    assert resume(name).result() == analyse(name)
+    data[:5].tofile(name)
+    assert resume(name).result() == analyse(name)
+
+
+def test_follow(tmp_path):
+    name = str(tmp_path / "fifo")
+    os.mkfifo(name)
+    part = data[:250003]
+
+    def write():
+        with open(name, "wb") as outf:
+            for j in range(0, len(part), 7001):
+                outf.write(part[j : j + 7001].tobytes())
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    steps = [(t.n, p.offset, p.result()) for t, p in follow(name, 4096, 100000)]
+    writer.join()
+    assert [s[:2] for s in steps] == [(100000, 0), (200000, 100000), (250003, 200000)]
+    for end, start, res in steps:
+        assert res == NumpyAccumulator(start).update(part[start:end]).result()
+
+
+def test_stdin(tmp_path):
+    name = str(tmp_path / "data")
+    data[:300007].tofile(name)
+    for size in (1, 1000, 4099, 300007, 400000):
+        whole = NumpyAccumulator().update(data[: min(size, 300007)]).result()
+        assert streamdata(name, 4096, size).result() == whole
+    ref = subprocess.run(
+        [sys.executable, "ent.py", "-t", name], capture_output=True, check=True
+    )
+    with open(name, "rb") as inf:
+        out = subprocess.run(
+            [sys.executable, "ent.py", "-t", "-"],
+            stdin=inf,
+            capture_output=True,
+            check=True,
+        )
+    assert out.stdout == ref.stdout
+
+
+def test_sample(tmp_path):
+    name = str(tmp_path / "data")
+    data.tofile(name)
+    total, est, hw = sample(name, fraction=1.0)
+    n, e, c, m, mc, scc = NumpyAccumulator().update(data).result()
+    assert total == n == est[0]
+    assert est[1] == pytest.approx(e)
+    assert est[2:4] == pytest.approx((c, m))
+    assert abs(est[5] - scc) < 1e-4
+    total, est, hw = sample(name, 1 << 20, seed=7)
+    assert est[0] == 1 << 20
+    assert (total, est, hw) == sample(name, 1 << 20, seed=7)
+    assert est != sample(name, 1 << 20, seed=8)[1]
+    for v, exact, h in zip(est[1:], (e, c, m, mc, scc), hw):
+        assert abs(v - exact) < h
+    short = str(tmp_path / "short")
+    with open(short, "wb") as f:
+        f.write(b"Hello, world!")
+    total, est, hw = sample(short, fraction=1.0)
+    assert est[:2] == (13, pytest.approx(entropy(readdata(short)[1])))
+    assert all(math.isnan(h) for h in hw)
+    out = subprocess.run(
+        [sys.executable, "ent.py", "-t", "--sample=1", short],
+        capture_output=True,
+        text=True,
+    )
+    assert out.stdout.splitlines()[-1] == "5,13,n/a,n/a,n/a,n/a,n/a"
+    with pytest.raises(ValueError):
+        sample(os.devnull, 1000)
+    for opt in ("--sample=0", "--sample=1.5", "--sample-bytes=0"):
+        out = subprocess.run([sys.executable, "ent.py", opt, name], capture_output=True)
+        assert out.returncode == 2 and b"Traceback" not in out.stderr
+
+
+def test_verdict(tmp_path):
+    name = str(tmp_path / "data")
+    data.tofile(name)
+    code, n = verdict(name)
+    assert code == 0 and n < len(data)
+    assert verdict(name, limit=1000)[1] == 1000
+    for bad in (bytes(100000), b"ent" * 100000, bytes(range(256)) * 1000):
+        with open(name, "wb") as outf:
+            outf.write(bad)
+        assert verdict(name) == (1, 4096)
+    out = subprocess.run([sys.executable, "ent.py", "--verdict", "ent.py"])
+    assert out.returncode == 1
+    open(name, "wb").close()
+    assert verdict(name) == (4, 0)
+    out = subprocess.run(
+        [sys.executable, "ent.py", "--verdict", name], capture_output=True, text=True
+    )
+    assert out.returncode == 4 and "insufficient data" in out.stdout
+
+
+def test_pairs(tmp_path):
+    d = data[:300007]
+    good = np.bincount(d[:-1].astype(np.int64) * 256 + d[1:], minlength=65536)
+    assert np.array_equal(paircounts(d), good)
+    name = str(tmp_path / "data")
+    d.tofile(name)
+    acc = streamdata(name, 4099, acc=PairAccumulator())
+    assert np.array_equal(acc.pairs, good)
+    assert acc.result() == streamdata(name).result()
+    half = PairAccumulator().update(d[:1000])
+    half.merge(PairAccumulator(1000).update(d[1000:]))
+    assert np.array_equal(half.pairs, good)
+    n, e, cond, chi2, p = pairstats(acc.pairs)
+    # With 4.6 pairs per value, the entropy is underestimated.
+    assert n == len(d) - 1 and 15.7 < e < 16 and 7.7 < cond < 8 and 0.001 < p
+    # Every byte follows from the previous one.
+    n, e, cond, chi2, p = pairstats(paircounts(np.arange(100000, dtype=np.ubyte)))
+    assert abs(e - 8) < 1e-3 and abs(cond) < 1e-9 and p == 0
+    out = subprocess.run(
+        [sys.executable, "ent.py", "-t", "--pairs", name],
+        capture_output=True,
+        text=True,
+    )
+    assert out.stdout.splitlines()[-1].startswith(f"9,{len(d) - 1},")
+    d[:1].tofile(name)
+    out = subprocess.run(
+        [sys.executable, "ent.py", "--pairs", name], capture_output=True, text=True
+    )
+    assert out.returncode == 0 and out.stderr == ""
+    assert out.stdout.splitlines()[-1] == "- pairs: undefined (fewer than 2 bytes)"
+
+
+def test_empty(tmp_path):
+    empty, name = str(tmp_path / "empty"), str(tmp_path / "data")
+    open(empty, "wb").close()
+    data[:1000].tofile(name)
+    for opts in (["-t"], ["-t", "-c", "-s"], ["-t", "-b", "-j", "2"]):
+        out = subprocess.run(
+            [sys.executable, "ent.py", *opts, empty, name],
+            capture_output=True,
+            text=True,
+        )
+        assert out.returncode == 1
+        assert out.stderr == f"ent: {empty}: no data\n"
+        assert out.stdout.splitlines()[-1].startswith("1,")
+    out = subprocess.run(
+        [sys.executable, "ent.py", "-t", "-"], input="", capture_output=True, text=True
+    )
+    assert (out.returncode, out.stdout, out.stderr) == (1, "", "ent: -: no data\n")
@@ -0,0 +1,112 @@
+# file: test-profile.py
+# vim:fileencoding=utf-8:ft=python
+#
+# Author: R.F. Smith <rsmith@xs4all.nl>
+# Created: 2026-10-17T20:31:17+0200
+# Last modified: 2026-10-17T23:41:09+0200
+"""Test the instrumentation in ent_profile.py.
+
+Use “py.test -v test/test-profile.py” from the main directory to run these
+tests.
+"""
+
+import json
+import random
+import sys
+import time
+import pytest
+
+sys.path.insert(1, ".")
+
+
+import ent_profile  # noqa
+import ent_without_numpy  # noqa
+from ent_accumulator import EntAccumulator, accresult  # noqa
+
+rnd = random.Random(20261017)
+data = rnd.randbytes(10007)
+
+
+def test_profiler():
+    seen = []
+    ent_profile.register(seen.append)
+    try:
+        with ent_profile.Profiler() as prof:
+            prof.file = "data"
+            with prof.stage("copy") as rec:
+                copy = bytearray(data)
+                rec["bytes"] = len(copy)
+            records = prof.take()
+    finally:
+        ent_profile.unregister(seen.append)
+    assert records == seen and prof.take() == []
+    assert records[0]["file"] == "data" and records[0]["stage"] == "copy"
+    assert records[0]["bytes"] == len(data)
+    assert records[0]["wall"] >= 0 and records[0]["cpu"] >= 0
+    assert records[0]["peak"] >= len(data)
+
+
+def test_disabled():
+    with ent_profile.Profiler(False) as prof:
+        with prof.stage("nothing"):
+            pass
+        with ent_profile.stage("nothing") as rec:
+            rec["bytes"] = 1
+    assert prof.take() == []
+
+
+def test_nested():
+    with ent_profile.Profiler() as prof:
+        with ent_profile.stage("outer"):
+            for _ in range(3):
+                with ent_profile.stage("inner", 10):
+                    time.sleep(0.01)
+    inner, outer = prof.take()
+    assert (inner["stage"], outer["stage"]) == ("inner", "outer")
+    # The time of the inner stages is not included in that of the outer one.
+    assert inner["wall"] >= 0.03 and outer["wall"] < 0.01
+    assert outer["bytes"] is None and inner["bytes"] == 30
+    assert ent_profile._active is None
+
+
+def test_accresult():
+    acc = EntAccumulator().update(data)
+    with ent_profile.Profiler() as prof:
+        assert accresult(acc) == acc.result()
+        assert accresult(acc, True) == acc.bitresult()
+    records = prof.take()
+    names = ["entropy", "chisquare", "mean", "montecarlo", "correlation"]
+    assert [r["stage"] for r in records] == names + ["bitresult"]
+    assert all(r["bytes"] is None for r in records)
+
+
+def test_main(tmp_path, capsys):
+    name = tmp_path / "data"
+    name.write_bytes(data)
+    out = tmp_path / "profile.json"
+    ent_without_numpy.main(["-t", "--profile-json", str(out), str(name)])
+    assert capsys.readouterr().out.count("\n") == 2
+    records = [json.loads(ln) for ln in out.read_text().splitlines()]
+    assert records[0]["stage"] == "read" and records[-1]["stage"] == "pochisq"
+    assert all(r["file"] == str(name) for r in records)
+    stages = {r["stage"]: r for r in records}
+    assert stages["read"]["bytes"] == stages["scan"]["bytes"] == len(data)
+
+
+def test_numpy_stages(tmp_path, monkeypatch):
+    ent = pytest.importorskip("ent")
+    monkeypatch.setattr(ent, "ent_kernel", None)
+    name = tmp_path / "data"
+    name.write_bytes(data)
+    out = tmp_path / "profile.json"
+    ent.main(["-t", "-s", "--chunksize", "4096", "--profile-json", str(out), str(name)])
+    stages = {}
+    for ln in out.read_text().splitlines():
+        r = json.loads(ln)
+        stages[r["stage"]] = r["bytes"]
+    for s in ("read", "histogram", "productsum"):
+        assert stages[s] == len(data)
+    # Groups that span two chunks are counted outside the stage.
+    assert 0 < stages["montecount"] <= len(data)
+    assert "bitpairs" not in stages
+    assert stages["accumulate"] is None and stages["entropy"] is None
@@ -3,7 +3,7 @@
 #
 # Author: R.F. Smith <rsmith@xs4all.nl>
 # Created: 2017-02-26 23:08:58 +0100
-# Last modified: 2020-10-24T11:49:35+0200
+# Last modified: 2026-10-17T22:31:08+0200
 """Test routines from ent.py by comparing the results from a known batch of
 random data to the results given by John Walker's ent.
 
@@ -11,7 +11,9 @@ Use “pytest-3.6 -v test/test_routines.py” from the main directory to run the
 tests.
 """
 
+import random
 import statistics as stat
+import subprocess
 import sys
 
 sys.path.insert(1, ".")
@@ -19,7 +21,9 @@ sys.path.insert(1, ".")
 
 from ent_without_numpy import (
     readdata,
+    bytecounts,
     entropy,
+    mean,
     pearsonchisquare,
     correlation,
     monte_carlo,
@@ -65,3 +69,54 @@ def test_mc():
     e = good["Monte-Carlo-Pi"]
     d = 0.001
     assert (e - d) < monte_carlo(data) < (e + d)
+
+
+def test_mean_counts():
+    e = good["Mean"]
+    d = 0.00001
+    assert (e - d) < mean(counts) < (e + d)
+
+
+def reference_correlation(d):
+    """Straightforward serial correlation, for comparison."""
+    n = len(d)
+    scct1 = sum(i * j for i, j in zip(d, d[1:] + d[:1]))
+    scct2 = sum(d) ** 2
+    scct3 = sum(j * j for j in d)
+    return (n * scct1 - scct2) / (n * scct3 - scct2)
+
+
+def reference_monte_carlo(d):
+    """Straightforward Monte Carlo count, for comparison."""
+    v = [int.from_bytes(d[j : j + 3], "big") for j in range(0, len(d) // 6 * 6, 3)]
+    inmont = sum(x * x + y * y <= (256**3 - 1) ** 2 for x, y in zip(v[::2], v[1::2]))
+    return 4 * inmont / (len(d) // 6)
+
+
+def test_reference():
+    rnd = random.Random(20261017)
+    for size in (6, 7, 100, 4099, (1 << 20) + 13):
+        d = rnd.randbytes(size)
+        assert bytecounts(d) == [d.count(j) for j in range(256)]
+        assert correlation(d) == reference_correlation(d)
+        assert monte_carlo(d) == reference_monte_carlo(d)
+    # Skewed data, so that the Monte Carlo table cannot decide most points.
+    d = bytes(rnd.choice(b"\x00\xb4\xb5\xb6\xff") for _ in range(60000))
+    assert correlation(d) == reference_correlation(d)
+    assert monte_carlo(d) == reference_monte_carlo(d)
+
+
+def test_empty(tmp_path):
+    empty = str(tmp_path / "empty")
+    open(empty, "wb").close()
+    for prog in ("ent_without_numpy.py", "ent_decimal.py"):
+        out = subprocess.run(
+            [sys.executable, prog, "-t", empty, "-", empty],
+            input="",
+            capture_output=True,
+            text=True,
+        )
+        assert out.returncode == 1 and out.stdout == ""
+        assert out.stderr.splitlines() == [
+            f"ent: {n}: no data" for n in (empty, "-", empty)
+        ]